@@ -0,0 +1,56 @@
+"""Compares `forwards` with the equivalent ``embed(outer, mask(inner))``,
+which builds and validates the masked signature only to sort its
+parameters again.
+
+Run with ``python benchmarks/bench_forwards.py``.
+"""
+
+import timeit
+
+from sigtools import _signatures
+from sigtools.support import s
+
+
+STACKS = [
+    ('self, *args, **kwargs', 'self, a, b=1, *, c=2',
+     1, ()),
+    ('request, *args, timeout=None, **kwargs', 'request, url, data=None, *,'
+     ' headers=None, verify=True', 1, ('verify',)),
+    ('*args, **kwargs', 'a, b, c, d, e, f, g, h, *args, i, j, k, **kwargs',
+     2, ('i', 'j')),
+]
+
+
+def composed(outer, inner, num_args, named_args):
+    return _signatures.embed(
+        True, True, outer,
+        _signatures.mask(inner, num_args, False, False, False, False,
+                         *named_args))
+
+
+def fused(outer, inner, num_args, named_args):
+    return _signatures.forwards(outer, inner, num_args, False, False,
+                                True, True, False, *named_args)
+
+
+def run(number=2000):
+    _signatures.algebra_cache.disable()
+    print('{0:<8}{1:>16}{2:>12}{3:>10}'.format(
+        'stack', 'composed (us)', 'fused (us)', 'speedup'))
+    for i, (outer, inner, num_args, named_args) in enumerate(STACKS):
+        args = s(outer, name='o'), s(inner, name='i'), num_args, named_args
+        exp, ret = composed(*args), fused(*args)
+        assert str(exp) == str(ret) and exp.sources == ret.sources
+        for sources in (True, False):
+            with _signatures.source_tracking.scope(sources):
+                slow = min(timeit.repeat(
+                    lambda: composed(*args), number=number, repeat=5))
+                fast = min(timeit.repeat(
+                    lambda: fused(*args), number=number, repeat=5))
+            print('{0:<8}{1:>16.1f}{2:>12.1f}{3:>9.1f}x'.format(
+                '{0}{1}'.format(i, '' if sources else ' -src'),
+                slow / number * 1e6, fast / number * 1e6, slow / fast))
+
+
+if __name__ == '__main__':
+    run()
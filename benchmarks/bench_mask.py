@@ -0,0 +1,39 @@
+"""Times `mask` on signatures of growing width, passing half of the
+parameters positionally and naming a quarter of the keyword-only ones
+along with one positional-or-keyword parameter. The time per parameter
+should stay roughly constant.
+
+Run with ``python benchmarks/bench_mask.py``.
+"""
+
+import timeit
+
+from sigtools import _signatures
+from sigtools.support import s
+
+
+def make_args(n):
+    pokargs = ['a{0}'.format(i) for i in range(n)]
+    kwoargs = ['k{0}'.format(i) for i in range(n)]
+    sig = s('{0}, *, {1}'.format(', '.join(pokargs), ', '.join(kwoargs)))
+    named = [pokargs[n * 3 // 4]] + kwoargs[:n // 4]
+    return (sig, n // 2, False, False, False, False) + tuple(named)
+
+
+def run():
+    _signatures.algebra_cache.disable()
+    print('{0:<8}{1:>12}{2:>16}'.format(
+        'params', 'mask (us)', 'per param (ns)'))
+    for n in (5, 50, 250, 500, 1000):
+        args = make_args(n)
+        number = max(20000 // n, 5)
+        with _signatures.source_tracking.scope(False):
+            best = min(timeit.repeat(
+                lambda: _signatures.mask(*args), number=number, repeat=5))
+        per_call = best / number
+        print('{0:<8}{1:>12.1f}{2:>16.1f}'.format(
+            2 * n, per_call * 1e6, per_call / (2 * n) * 1e9))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,42 @@
+"""Compares ``merge(*sigs)`` with folding `merge` over the signatures two
+at a time. Both merge the parameters pairwise, but ``merge(*sigs)`` does
+so in sorted form, builds a single signature and merges the depths of all
+the callables once, whereas the fold builds a signature and merges the
+depths of every callable seen so far at each step.
+
+Run with ``python benchmarks/bench_merge.py``.
+"""
+
+import timeit
+import functools
+
+from sigtools import _signatures
+from sigtools.support import s
+
+
+def fold(sigs):
+    return functools.reduce(_signatures.merge, sigs)
+
+
+def make_sigs(n):
+    return [s('a, b=1, *args, c, d=2, **kwargs', name='_' + str(i))
+            for i in range(n)]
+
+
+def run(number=20):
+    _signatures.algebra_cache.disable()
+    print('{0:<6}{1:>12}{2:>20}{3:>10}'.format(
+        'N', 'fold (us)', 'merge(*sigs) (us)', 'speedup'))
+    for n in (2, 10, 50, 100):
+        sigs = make_sigs(n)
+        assert fold(sigs).sources == _signatures.merge(*sigs).sources
+        slow = min(timeit.repeat(
+            lambda: fold(sigs), number=number, repeat=3))
+        fast = min(timeit.repeat(
+            lambda: _signatures.merge(*sigs), number=number, repeat=3))
+        print('{0:<6}{1:>12.1f}{2:>20.1f}{3:>9.1f}x'.format(
+            n, slow / number * 1e6, fast / number * 1e6, slow / fast))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,44 @@
+"""Compares building the signature of plain functions from their code
+object with going through `inspect.signature`.
+
+Run with ``python benchmarks/bench_signature.py``.
+"""
+
+import timeit
+
+from sigtools import _signatures, _util
+
+
+def small(a, b):
+    pass
+
+
+def medium(a, b=1, *args, **kwargs):
+    pass
+
+
+def large(a, b, c, d=1, e=2, f=3, *args, **kwargs):
+    pass
+
+
+def inspect_path(func):
+    sig = _util.funcsigs.signature(func)
+    return _signatures.set_default_sources(sig, func)
+
+
+def run(number=20000):
+    print('{0:<10}{1:>14}{2:>14}{3:>10}'.format(
+        'function', 'inspect (us)', 'code (us)', 'speedup'))
+    for func in (small, medium, large):
+        assert inspect_path(func) == _signatures.function_signature(func)
+        slow = min(timeit.repeat(
+            lambda: inspect_path(func), number=number, repeat=3))
+        fast = min(timeit.repeat(
+            lambda: _signatures.signature(func), number=number, repeat=3))
+        print('{0:<10}{1:>14.2f}{2:>14.2f}{3:>9.1f}x'.format(
+            func.__name__, slow / number * 1e6, fast / number * 1e6,
+            slow / fast))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,82 @@
+"""Compares the memory allocated and the time taken by the signature
+algebra with and without computing ``sources``.
+
+Run with ``python benchmarks/bench_sources.py``. Allocations are measured
+with `tracemalloc`, on Python 3.4 and later.
+"""
+
+import timeit
+import functools
+
+from sigtools import _signatures, specifiers
+
+try:
+    import tracemalloc
+except ImportError: # pragma: no cover
+    tracemalloc = None
+
+
+def inner(a, b, c=1, *args, **kwargs):
+    pass
+
+
+def outer(x, y=2, *args, **kwargs):
+    return inner(*args, **kwargs)
+
+
+def operations():
+    outer_sig = _signatures.signature(outer)
+    inner_sig = _signatures.signature(inner)
+    return [
+        ('signature', lambda: _signatures.signature(inner)),
+        ('partial', lambda: _signatures.signature(
+            functools.partial(inner, 1, c=3))),
+        ('merge', lambda: _signatures.merge(*[inner_sig] * 10)),
+        ('embed', lambda: _signatures.embed(True, True, outer_sig, inner_sig)),
+        ('mask', lambda: _signatures.mask(inner_sig, 1, False, False,
+                                          False, False, 'c')),
+        ('forwards', lambda: _signatures.forwards(outer_sig, inner_sig, 1)),
+        ('forged', lambda: specifiers.signature(outer)),
+        ]
+
+
+def allocated(func, number):
+    tracemalloc.start()
+    try:
+        for _ in range(number):
+            func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def timed(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def measure(func, number, sources):
+    with _signatures.source_tracking.scope(sources):
+        kib = None
+        if tracemalloc is not None:
+            # results are kept alive to count what they retain
+            results = []
+            kib = allocated(lambda: results.append(func()), number) / 1024.
+        return kib, timed(func, number) * 1e6
+
+
+def run(number=2000):
+    _signatures.algebra_cache.disable()
+    print('{0:<10}{1:>14}{2:>14}{3:>14}{4:>14}'.format(
+        'operation', 'tracked (KiB)', 'off (KiB)', 'tracked (us)',
+        'off (us)'))
+    for name, func in operations():
+        on_kib, on_us = measure(func, number, True)
+        off_kib, off_us = measure(func, number, False)
+        if on_kib is None:
+            on_kib = off_kib = float('nan')
+        print('{0:<10}{1:>14.1f}{2:>14.1f}{3:>14.2f}{4:>14.2f}'.format(
+            name, on_kib, off_kib, on_us, off_us))
+
+
+if __name__ == '__main__':
+    run()
@@ -3,9 +3,10 @@ import ast
 import collections
 import functools
 import types
+import weakref
 
 from sigtools import _signatures, _util
-from sigtools._specifiers import forged_signature
+from sigtools._specifiers import forwarded_signature, Resolution
 
 try:
     from collections.abc import MutableMapping
@@ -146,6 +147,15 @@ else:
         return arg.arg
 
 
+def get_body(node):
+    body = node.body
+    try:
+        iter(body)
+    except TypeError: # handle lambdas as well
+        body = [node.body]
+    return body
+
+
 class CallListerVisitor(ast.NodeVisitor):
     def __init__(self, func):
         self.func = func
@@ -156,7 +166,7 @@ class CallListerVisitor(ast.NodeVisitor):
         self.varkwargs = None
 
         self.process_parameters(func.args, main=True)
-        for stmt in func.body:
+        for stmt in get_body(func):
             self.visit(stmt)
         for node, ns in self.to_revisit:
             self.namespace = ns
@@ -196,12 +206,7 @@ class CallListerVisitor(ast.NodeVisitor):
     def visit_FunctionDef(self, node):
         self.namespace = Namespace(self.namespace)
         self.process_parameters(node.args)
-        body = node.body
-        try:
-            iter(body)
-        except TypeError: # handle lambdas as well
-            body = [node.body]
-        for stmt in body:
+        for stmt in get_body(node):
             self.visit(stmt)
         self.namespace = self.namespace.parent
 
@@ -297,19 +302,39 @@ def resolve_name(obj, func, args, unknown=False):
         raise
 
 
+def arg_names(obj):
+    """Lists the parameters that ``obj`` is looked up from."""
+    while isinstance(obj, Attribute):
+        obj = obj.value
+    if isinstance(obj, Arg):
+        return [obj.name]
+    return []
+
+
 def forward_signatures(func, calls, args, kwargs, sig):
     if args or kwargs:
         bap = sig.bind_partial(*args, **kwargs)
     else:
         bap = EmptyBoundArguments()
+    sensitivity = Resolution.current_sensitivity()
     def rn(obj, unknown=True):
         return resolve_name(obj, func, bap.arguments, unknown=unknown)
+    def use(objs):
+        if sensitivity is None:
+            return
+        for obj in objs:
+            for name in arg_names(obj):
+                try:
+                    sensitivity.use(bap.arguments[name])
+                except KeyError:
+                    sensitivity.use()
     for (
             wrapped, fwdargs, fwdkwargs, fwdvarargs, fwdvarkwargs,
             use_varargs, use_varkwargs,
             hide_args, hide_kwargs) in calls:
         if not (use_varargs or use_varkwargs):
             continue
+        use([wrapped])
         try:
             wrapped_func = rn(wrapped, unknown=False)
         except UnresolvableName:
@@ -318,14 +343,19 @@ def forward_signatures(func, calls, args, kwargs, sig):
         fwdargsvals.extend(rn(fwdvarargs))
         fwdkwargsvals = dict((n, rn(arg)) for n, arg in fwdkwargs.items())
         fwdkwargsvals.update(rn(fwdvarkwargs))
+        forwarded = list(fwdargs) + list(fwdkwargs.values())
+        forwarded.extend([fwdvarargs, fwdvarkwargs])
         using_partial = wrapped_func == functools.partial
         if using_partial:
             wrapped_func = fwdargsvals.pop(0)
         try:
-            wrapped_sig = forged_signature(
-                wrapped_func, args=fwdargsvals, kwargs=fwdkwargsvals)
+            wrapped_sig, sensitive = forwarded_signature(
+                wrapped_func, fwdargsvals, fwdkwargsvals)
         except (ValueError, TypeError):
+            use(forwarded)
             raise UnknownForwards
+        if sensitive or using_partial:
+            use(forwarded)
         try:
             ausig = _signatures.forwards(
                 sig, wrapped_sig,
@@ -379,15 +409,117 @@ class cleanup_functools_wrapper(object):
             setattr(self.func, attr, val)
 
 
+known_failures = weakref.WeakKeyDictionary()
+"""Maps code objects to the reason automatic signature discovery can never
+succeed on functions using them.
+
+Only failures that depend on the code alone are recorded, not those caused
+by names that could not be resolved at the time.
+"""
+
+
+def _fail_for_code(func, reason):
+    if isinstance(func, types.FunctionType):
+        known_failures[func.__code__] = reason
+    return UnknownForwards(reason)
+
+
+_unknown = Unknown()
+
+
+def _compact_name(obj):
+    if isinstance(obj, Unknown):
+        return _unknown
+    elif isinstance(obj, Attribute):
+        return Attribute(_compact_name(obj.value), obj.attr)
+    return obj
+
+
+def compact_calls(calls):
+    """Keeps only the calls that forward ``*args`` or ``**kwargs``, without
+    references to the AST they were found in."""
+    ret = []
+    for call in calls:
+        if not (call.use_varargs or call.use_varkwargs):
+            continue
+        ret.append(call._replace(
+            wrapped=_compact_name(call.wrapped),
+            args=tuple(_compact_name(arg) for arg in call.args),
+            kwargs=dict(
+                (name, _compact_name(arg))
+                for name, arg in call.kwargs.items()),
+            varargs=_compact_name(call.varargs),
+            varkwargs=_compact_name(call.varkwargs),
+            ))
+    return tuple(ret)
+
+
+_templates_by_node = weakref.WeakKeyDictionary()
+_templates_by_code = weakref.WeakKeyDictionary()
+
+
+def call_templates(func_ast):
+    """Returns the forwarding calls found in ``func_ast``.
+
+    They only depend on the AST and are computed once per node. Names in them
+    are resolved separately for each function by `forward_signatures`.
+    """
+    try:
+        return _templates_by_node[func_ast]
+    except KeyError:
+        pass
+    ret = _templates_by_node[func_ast] = compact_calls(
+        CallListerVisitor(func_ast))
+    return ret
+
+
+def function_call_templates(func):
+    """Like `call_templates`, for the definition of ``func``, computed once
+    per code object. When the source can't be found, the calls are read from
+    the bytecode instead. Returns `None` if neither can be analysed."""
+    code = func.__code__
+    try:
+        return _templates_by_code[code]
+    except KeyError:
+        pass
+    ret = _source_call_templates(func)
+    if ret is None:
+        ret = _bytecode.code_call_templates(code)
+        if ret is None:
+            return None
+    _templates_by_code[code] = ret
+    return ret
+
+
+def _source_call_templates(func):
+    func_ast = _util.get_ast(func)
+    if func_ast is None:
+        return None
+    return call_templates(func_ast)
+
+
 def autoforwards_function(func, args, kwargs):
+    if isinstance(func, types.FunctionType):
+        reason = known_failures.get(func.__code__)
+        if reason is not None:
+            raise UnknownForwards(reason)
     with cleanup_functools_wrapper(func):
         sig = _signatures.signature(func)
     if not any_params_star(sig):
-        raise UnknownForwards
-    func_ast = _util.get_ast(func)
-    if func_ast is None:
-        raise UnknownForwards
-    return autoforwards_ast(func, func_ast, sig, args, kwargs)
+        raise _fail_for_code(func, 'No *args or **kwargs parameter')
+    if isinstance(func, types.FunctionType):
+        if not _bytecode.may_forward(func.__code__):
+            raise _fail_for_code(
+                func, 'No forwarding of *args, **kwargs found')
+        calls = function_call_templates(func)
+    else:
+        func_ast = _util.get_ast(func)
+        calls = None if func_ast is None else call_templates(func_ast)
+    if calls is None:
+        raise _fail_for_code(func, 'Source code unavailable')
+    if not calls:
+        raise _fail_for_code(func, 'No forwarding of *args, **kwargs found')
+    return _autoforwards_calls(func, calls, sig, args, kwargs)
 
 
 def autoforwards_hint(func, args, kwargs):
@@ -399,9 +531,12 @@ def autoforwards_hint(func, args, kwargs):
 
 
 def autoforwards_ast(func, func_ast, sig, args=(), kwargs={}):
-    sigs = list(forward_signatures(
-        func, CallListerVisitor(func_ast),
-        args, kwargs, sig))
+    return _autoforwards_calls(
+        func, call_templates(func_ast), sig, args, kwargs)
+
+
+def _autoforwards_calls(func, calls, sig, args, kwargs):
+    sigs = list(forward_signatures(func, calls, args, kwargs, sig))
     if sigs:
         return _signatures.merge(*sigs)
     else:
@@ -429,3 +564,6 @@ def autoforwards(obj, args=(), kwargs={}):
         return autoforwards_method(obj, args, kwargs)
     else:
         return autoforwards_function(obj, args, kwargs)
+
+
+from sigtools import _bytecode
@@ -0,0 +1,567 @@
+# sigtools - Collection of Python modules for manipulating function signatures
+# Copyright (c) 2013-2015 Yann Kaiser
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Finds the calls forwarding ``*args`` and ``**kwargs`` by walking a
+function's bytecode instead of its source.
+
+The stack is simulated linearly, only following values that can end up in a
+call's callable or its ``*args``/``**kwargs``. Anything that isn't understood
+becomes unknown, so that the analysis errs towards finding no forwarding.
+"""
+
+import sys
+import dis
+import types
+import weakref
+
+from sigtools._autoforwards import (
+    Name, Attribute, Arg, Unknown, Call, compact_calls)
+
+
+CO_VARARGS = 0x04
+CO_VARKEYWORDS = 0x08
+
+_py = sys.version_info[:2]
+# where the NULL pushed for calls lies relative to the callable
+_null_below_callable = (3, 11) <= _py < (3, 13)
+_null_after_global = _py >= (3, 13)
+
+_unknown = Unknown()
+
+
+class _Null(object):
+    def __repr__(self):
+        return '<NULL>'
+_null = _Null()
+
+
+class _Const(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class _Star(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class _Seq(object):
+    """A list or tuple being built for a call's positional arguments"""
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def extend(self, value):
+        if isinstance(value, _Seq):
+            return _Seq(self.items + value.items)
+        if isinstance(value, _Const) and isinstance(value.value, tuple):
+            return _Seq(self.items + tuple(_Const(v) for v in value.value))
+        return _Seq(self.items + (_Star(value),))
+
+
+class _Map(object):
+    """A dict being built for a call's named arguments"""
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def update(self, value):
+        if isinstance(value, _Map):
+            return _Map(self.items + value.items)
+        return _Map(self.items + (_Star(value),))
+
+
+class _Stack(object):
+    def __init__(self, items=(), bottomless=False):
+        self.items = list(items)
+        self.bottomless = bottomless
+
+    def copy(self):
+        return _Stack(self.items, self.bottomless)
+
+    def push(self, *values):
+        self.items.extend(values)
+
+    def pop(self, n=None):
+        if n is None:
+            if self.items:
+                return self.items.pop()
+            self.bottomless = True
+            return _unknown
+        return list(reversed([self.pop() for _ in range(n)]))
+
+    def peek(self, i=1):
+        if len(self.items) >= i:
+            return self.items[-i]
+        return _unknown
+
+    def set(self, i, value):
+        if len(self.items) >= i:
+            self.items[-i] = value
+
+    def forget(self):
+        self.items = []
+        self.bottomless = True
+
+    def adjust(self, effect):
+        if effect < 0:
+            self.pop(-effect)
+        else:
+            self.push(*[_unknown] * effect)
+
+
+def _merge_stacks(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if (left.bottomless or right.bottomless
+            or len(left.items) != len(right.items)):
+        return _Stack(bottomless=True)
+    return _Stack(l if l is r else _unknown
+                  for l, r in zip(left.items, right.items))
+
+
+try:
+    _jump_ops = set(dis.hasjrel) | set(dis.hasjabs)
+    _jump_ops.update(getattr(dis, 'hasjump', ()))
+    get_instructions = dis.get_instructions
+except AttributeError: # pragma: no cover
+    get_instructions = None
+
+_unconditional = set([
+    'JUMP_FORWARD', 'JUMP_ABSOLUTE', 'JUMP_BACKWARD', 'JUMP',
+    'JUMP_NO_INTERRUPT', 'JUMP_BACKWARD_NO_INTERRUPT',
+    'RETURN_VALUE', 'RETURN_CONST', 'RAISE_VARARGS', 'RERAISE',
+    ])
+
+_no_ops = set([
+    'NOP', 'RESUME', 'EXTENDED_ARG', 'MAKE_CELL', 'COPY_FREE_VARS',
+    'PRECALL', 'CACHE', 'NOT_TAKEN', 'LIST_TO_TUPLE', 'SETUP_ANNOTATIONS',
+    ])
+
+_produce_one = set([
+    'BINARY_OP', 'BINARY_SUBSCR', 'BINARY_SLICE', 'COMPARE_OP', 'IS_OP',
+    'CONTAINS_OP', 'UNARY_POSITIVE', 'UNARY_NEGATIVE', 'UNARY_NOT',
+    'UNARY_INVERT', 'GET_ITER', 'GET_LEN', 'FORMAT_VALUE', 'FORMAT_SIMPLE',
+    'FORMAT_WITH_SPEC', 'CONVERT_VALUE', 'TO_BOOL', 'BUILD_STRING',
+    'BUILD_SET', 'BUILD_SLICE', 'IMPORT_NAME', 'IMPORT_FROM',
+    'MAKE_FUNCTION', 'SET_FUNCTION_ATTRIBUTE', 'LOAD_BUILD_CLASS',
+    'LOAD_ASSERTION_ERROR', 'LOAD_CLOSURE', 'GET_AWAITABLE',
+    'GET_YIELD_FROM_ITER', 'YIELD_VALUE', 'LOAD_LOCALS', 'LOAD_SMALL_INT',
+    ])
+_produce_one.update(
+    name for name in dis.opname
+    if name.startswith(('BINARY_', 'INPLACE_')))
+
+_produce_none = set([
+    'POP_TOP', 'STORE_ATTR', 'STORE_SUBSCR', 'STORE_SLICE', 'STORE_GLOBAL',
+    'STORE_NAME', 'DELETE_ATTR', 'DELETE_SUBSCR', 'DELETE_GLOBAL',
+    'DELETE_NAME', 'PRINT_EXPR', 'SET_ADD', 'END_FOR', 'POP_ITER',
+    ])
+
+
+def _stack_effect(instr, jump=None):
+    arg = instr.arg if instr.opcode >= dis.HAVE_ARGUMENT else None
+    if jump is None:
+        return dis.stack_effect(instr.opcode, arg)
+    return dis.stack_effect(instr.opcode, arg, jump=jump)
+
+
+def _parameter_names(code):
+    nparams = code.co_argcount + getattr(code, 'co_kwonlyargcount', 0)
+    varargs = varkwargs = None
+    if code.co_flags & CO_VARARGS:
+        varargs = code.co_varnames[nparams]
+        nparams += 1
+    if code.co_flags & CO_VARKEYWORDS:
+        varkwargs = code.co_varnames[nparams]
+        nparams += 1
+    return code.co_varnames[:nparams], varargs, varkwargs
+
+
+def _walk_code(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            for nested in _walk_code(const):
+                yield nested
+
+
+class BytecodeCallLister(object):
+    """Lists the calls made by a code object and the code objects nested in
+    it, as `Call` records like `CallListerVisitor` produces."""
+
+    def __init__(self, code):
+        self.code = code
+        names, self.varargs, self.varkwargs = _parameter_names(code)
+        self.params = dict((name, Arg(name)) for name in names)
+        self.names = {}
+        self.rebound_cells = set()
+        self.calls = []
+        self._find_rebound_cells(code)
+        self._process(code, self.params, set(code.co_freevars))
+
+    def __iter__(self):
+        return iter(self.calls)
+
+    def _find_rebound_cells(self, code):
+        for nested in _walk_code(code):
+            for instr in get_instructions(nested):
+                if instr.opname in ('STORE_DEREF', 'DELETE_DEREF'):
+                    self.rebound_cells.add(instr.argval)
+
+    def _name(self, name):
+        try:
+            return self.names[name]
+        except KeyError:
+            ret = self.names[name] = Name(name)
+            return ret
+
+    def _process(self, code, params, freevars):
+        self.scope = code, params, freevars, set()
+        stack = _Stack()
+        targets = {}
+        for instr in get_instructions(code):
+            jumped = targets.pop(instr.offset, None)
+            if stack is None:
+                stack = jumped or _Stack(bottomless=True)
+            else:
+                stack = _merge_stacks(stack, jumped)
+            if instr.opcode in _jump_ops:
+                stack, jump_stack = self._jump(instr, stack)
+                target = instr.argval
+                if isinstance(target, int) and target > instr.offset:
+                    targets[target] = _merge_stacks(
+                        targets.get(target), jump_stack)
+            else:
+                self._step(instr, stack)
+            if instr.opname in _unconditional:
+                stack = None
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self._process(
+                    const,
+                    dict((name, arg) for name, arg in params.items()
+                         if name in const.co_freevars),
+                    freevars & set(const.co_freevars))
+
+    def _jump(self, instr, stack):
+        jump_stack = stack.copy()
+        try:
+            jump_stack.adjust(_stack_effect(instr, True))
+        except (TypeError, ValueError):
+            jump_stack = _Stack(bottomless=True)
+        try:
+            stack.adjust(_stack_effect(instr, False))
+        except (TypeError, ValueError):
+            stack.forget()
+        return stack, jump_stack
+
+    def _load_fast(self, name):
+        code, params, freevars, rebound = self.scope
+        if code is self.code and name in params and name not in rebound:
+            return params[name]
+        return _unknown
+
+    def _load_deref(self, name):
+        code, params, freevars, rebound = self.scope
+        if name in params and name not in self.rebound_cells:
+            return params[name]
+        if name in freevars:
+            return self._name(name)
+        return _unknown
+
+    def _step(self, instr, stack):
+        op = instr.opname
+        arg = instr.argval
+        rebound = self.scope[3]
+        if op in _no_ops:
+            pass
+        elif op in ('LOAD_FAST', 'LOAD_FAST_CHECK', 'LOAD_FAST_BORROW',
+                    'LOAD_FAST_AND_CLEAR'):
+            stack.push(self._load_fast(arg))
+        elif op in ('LOAD_FAST_LOAD_FAST',
+                    'LOAD_FAST_BORROW_LOAD_FAST_BORROW'):
+            stack.push(*[self._load_fast(name)
+                         for name in arg])
+        elif op in ('STORE_FAST', 'DELETE_FAST'):
+            rebound.add(arg)
+            if op == 'STORE_FAST':
+                stack.pop()
+        elif op == 'STORE_FAST_LOAD_FAST':
+            rebound.add(arg[0])
+            stack.pop()
+            stack.push(self._load_fast(arg[1]))
+        elif op == 'STORE_FAST_STORE_FAST':
+            rebound.update(arg)
+            stack.pop(2)
+        elif op in ('LOAD_DEREF', 'LOAD_CLASSDEREF'):
+            stack.push(self._load_deref(arg))
+        elif op in ('STORE_DEREF',):
+            stack.pop()
+        elif op in ('LOAD_GLOBAL', 'LOAD_NAME'):
+            push_null = op == 'LOAD_GLOBAL' and _py >= (3, 11) and instr.arg & 1
+            if push_null and not _null_after_global:
+                stack.push(_null)
+            stack.push(self._name(arg))
+            if push_null and _null_after_global:
+                stack.push(_null)
+        elif op == 'LOAD_CONST':
+            stack.push(_Const(arg))
+        elif op == 'PUSH_NULL':
+            stack.push(_null)
+        elif op in ('LOAD_ATTR', 'LOAD_METHOD'):
+            value = stack.pop()
+            attr = Attribute(value, arg) if value is not _unknown else _unknown
+            method = op == 'LOAD_METHOD' or (
+                _py >= (3, 12) and instr.arg & 1)
+            if method and _py >= (3, 13):
+                stack.push(attr, _null)
+            elif method:
+                stack.push(_null, attr)
+            else:
+                stack.push(attr)
+        elif op in ('BUILD_LIST', 'BUILD_TUPLE'):
+            stack.push(_Seq(stack.pop(instr.arg)))
+        elif op in ('BUILD_TUPLE_UNPACK_WITH_CALL', 'BUILD_TUPLE_UNPACK',
+                    'BUILD_LIST_UNPACK'):
+            seq = _Seq(())
+            for value in stack.pop(instr.arg):
+                seq = seq.extend(value)
+            stack.push(seq)
+        elif op == 'LIST_EXTEND':
+            value = stack.pop()
+            seq = stack.peek(instr.arg)
+            if isinstance(seq, _Seq):
+                stack.set(instr.arg, seq.extend(value))
+        elif op == 'LIST_APPEND':
+            value = stack.pop()
+            seq = stack.peek(instr.arg)
+            if isinstance(seq, _Seq):
+                stack.set(instr.arg, _Seq(seq.items + (value,)))
+        elif op == 'CALL_INTRINSIC_1':
+            if instr.argrepr != 'INTRINSIC_LIST_TO_TUPLE':
+                stack.pop()
+                stack.push(_unknown)
+        elif op == 'BUILD_MAP':
+            values = stack.pop(2 * instr.arg)
+            stack.push(_Map(zip(values[::2], values[1::2])))
+        elif op == 'BUILD_CONST_KEY_MAP':
+            keys = stack.pop()
+            values = stack.pop(instr.arg)
+            if isinstance(keys, _Const):
+                keys = [_Const(key) for key in keys.value]
+            else:
+                keys = [_unknown] * len(values)
+            stack.push(_Map(zip(keys, values)))
+        elif op in ('DICT_MERGE', 'DICT_UPDATE'):
+            value = stack.pop()
+            mapping = stack.peek(instr.arg)
+            if isinstance(mapping, _Map):
+                stack.set(instr.arg, mapping.update(value))
+        elif op in ('BUILD_MAP_UNPACK_WITH_CALL', 'BUILD_MAP_UNPACK'):
+            mapping = _Map(())
+            for value in stack.pop(instr.arg):
+                mapping = mapping.update(value)
+            stack.push(mapping)
+        elif op == 'MAP_ADD':
+            stack.pop(2)
+        elif op == 'CALL_FUNCTION_EX':
+            self._call_ex(stack, instr.arg is None or instr.arg & 1)
+        elif op in ('CALL_FUNCTION_VAR', 'CALL_FUNCTION_VAR_KW') or (
+                op == 'CALL_FUNCTION_KW' and _py < (3, 6)):
+            self._call_var(stack, op, instr.arg)
+        elif op in ('CALL_FUNCTION', 'CALL_FUNCTION_KW', 'CALL_METHOD',
+                    'CALL', 'CALL_KW'):
+            extra = {'CALL_FUNCTION': 1, 'CALL_FUNCTION_KW': 2,
+                     'CALL_KW': 3}.get(op, 2)
+            stack.pop(instr.arg + extra)
+            stack.push(_unknown)
+        elif op == 'KW_NAMES':
+            pass
+        elif op in ('POP_TOP',):
+            stack.pop()
+        elif op in ('DUP_TOP',):
+            stack.push(stack.peek())
+        elif op == 'COPY':
+            stack.push(stack.peek(instr.arg))
+        elif op in ('ROT_TWO', 'ROT_THREE', 'ROT_FOUR', 'SWAP', 'ROT_N'):
+            n = {'ROT_TWO': 2, 'ROT_THREE': 3, 'ROT_FOUR': 4}.get(op, instr.arg)
+            values = stack.pop(n)
+            if op == 'SWAP':
+                values[0], values[-1] = values[-1], values[0]
+            else:
+                values.insert(0, values.pop())
+            stack.push(*values)
+        elif op == 'UNPACK_SEQUENCE':
+            stack.pop()
+            stack.push(*[_unknown] * instr.arg)
+        elif op in _produce_one or op in _produce_none:
+            try:
+                effect = _stack_effect(instr)
+            except (TypeError, ValueError):
+                stack.forget()
+            else:
+                produced = 1 if op in _produce_one else 0
+                stack.pop(produced - effect)
+                stack.push(*[_unknown] * produced)
+        else:
+            stack.forget()
+
+    def _call_ex(self, stack, has_kwargs):
+        kwargs = stack.pop() if has_kwargs else _null
+        if kwargs is _null:
+            kwargs = _Map(())
+        args = stack.pop()
+        wrapped = stack.pop()
+        if wrapped is _null:
+            wrapped = stack.pop()
+        elif _null_below_callable and stack.peek() is _null:
+            stack.pop()
+        stack.push(_unknown)
+        self._add_call(wrapped, self._positional(args), self._named(kwargs))
+
+    def _call_var(self, stack, op, arg):
+        kwargs = stack.pop() if op != 'CALL_FUNCTION_VAR' else None
+        varargs = stack.pop() if op != 'CALL_FUNCTION_KW' else None
+        npos, nkw = arg & 0xff, (arg >> 8) & 0xff
+        pairs = stack.pop(2 * nkw)
+        args = stack.pop(npos)
+        wrapped = stack.pop()
+        stack.push(_unknown)
+        if varargs is not None:
+            args.append(_Star(varargs))
+        named = list(zip(pairs[::2], pairs[1::2]))
+        if kwargs is not None:
+            named.append(_Star(kwargs))
+        self._add_call(wrapped, args, named)
+
+    def _positional(self, value):
+        if isinstance(value, _Seq):
+            return list(value.items)
+        if isinstance(value, _Const) and isinstance(value.value, tuple):
+            return [_Const(v) for v in value.value]
+        return [_Star(value)]
+
+    def _named(self, value):
+        if isinstance(value, _Map):
+            return list(value.items)
+        return [_Star(value)]
+
+    def _resolve(self, value):
+        if isinstance(value, (Name, Arg)):
+            return value
+        if isinstance(value, Attribute):
+            return Attribute(self._resolve(value.value), value.attr)
+        return _unknown
+
+    def _stars(self, values, original):
+        if not values:
+            return None, False, False
+        if len(values) > 1:
+            return _unknown, False, True
+        value = self._resolve(values[0])
+        if original is not None and value is self.params.get(original):
+            return value, True, False
+        return value, False, True
+
+    def _add_call(self, wrapped, args, named):
+        kwargs = {}
+        starkwargs = []
+        for item in named:
+            if isinstance(item, _Star):
+                starkwargs.append(item.value)
+                continue
+            key, value = item
+            if isinstance(key, _Const) and isinstance(key.value, str):
+                kwargs[key.value] = self._resolve(value)
+            else:
+                starkwargs.append(_unknown)
+        varargs, use_varargs, hide_args = self._stars(
+            [arg.value for arg in args if isinstance(arg, _Star)],
+            self.varargs)
+        varkwargs, use_varkwargs, hide_kwargs = self._stars(
+            starkwargs, self.varkwargs)
+        self.calls.append(Call(
+            self._resolve(wrapped),
+            [self._resolve(arg) for arg in args if not isinstance(arg, _Star)],
+            kwargs, varargs, varkwargs,
+            use_varargs, use_varkwargs,
+            hide_args, hide_kwargs))
+
+
+def code_call_templates(code):
+    """Returns the forwarding calls found in ``code``'s bytecode, in the form
+    of `call_templates <sigtools._autoforwards.call_templates>`, or `None`
+    if the bytecode can't be analysed on this version of Python."""
+    if get_instructions is None: # pragma: no cover
+        return None
+    return compact_calls(BytecodeCallLister(code))
+
+
+_unpacking_calls = set([
+    'CALL_FUNCTION_EX', 'CALL_FUNCTION_VAR', 'CALL_FUNCTION_VAR_KW'])
+if _py < (3, 6):
+    _unpacking_calls.add('CALL_FUNCTION_KW')
+
+_variable_loads = set([
+    'LOAD_FAST', 'LOAD_FAST_CHECK', 'LOAD_FAST_BORROW', 'LOAD_FAST_AND_CLEAR',
+    'LOAD_FAST_LOAD_FAST', 'LOAD_FAST_BORROW_LOAD_FAST_BORROW',
+    'STORE_FAST_LOAD_FAST', 'LOAD_DEREF', 'LOAD_CLASSDEREF', 'LOAD_CLOSURE',
+    ])
+
+_may_forward = weakref.WeakKeyDictionary()
+
+
+def may_forward(code):
+    """Tells whether ``code`` might pass its ``*args`` or ``**kwargs`` on to
+    another callable, by checking that it has such parameters, loads them and
+    makes an unpacking call.
+
+    This is much cheaper than finding the calls themselves and is computed
+    once per code object. `False` means it certainly doesn't forward them."""
+    try:
+        return _may_forward[code]
+    except KeyError:
+        pass
+    ret = _may_forward[code] = _may_forward_uncached(code)
+    return ret
+
+
+def _may_forward_uncached(code):
+    _, varargs, varkwargs = _parameter_names(code)
+    stars = set(name for name in (varargs, varkwargs) if name is not None)
+    if not stars:
+        return False
+    if get_instructions is None: # pragma: no cover
+        return True
+    calls = loads = False
+    for nested in _walk_code(code):
+        for instr in get_instructions(nested):
+            if instr.opname in _unpacking_calls:
+                calls = True
+            elif instr.opname in _variable_loads:
+                names = instr.argval
+                if not isinstance(names, tuple):
+                    names = names,
+                loads = loads or not stars.isdisjoint(names)
+            if calls and loads:
+                return True
+    return False
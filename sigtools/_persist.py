@@ -0,0 +1,730 @@
+# sigtools - Collection of Python modules for manipulating function signatures
+# Copyright (c) 2013-2015 Yann Kaiser
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Converts signatures to and from a JSON-compatible form that can outlive
+the process.
+
+Callables are referred to by qualified name and paired with a hash of their
+code, and the modules they are defined in with a hash of their source, so
+that a stored signature is only used while the code it was computed from is
+unchanged. The module hashes cover what the code of the callables alone
+doesn't, such as the arguments passed to decorators or the functions that
+module globals are bound to. Parameter defaults and annotations are stored
+as their ``repr``, and restored from the callable the parameter came from,
+or else by evaluating literals.
+"""
+
+import os
+import ast
+import inspect
+import sys
+import json
+import atexit
+import hashlib
+import marshal
+import mmap
+import struct
+import tempfile
+import threading
+import types
+import weakref
+
+from sigtools import _signatures, _util
+
+try:
+    import fcntl
+except ImportError: # pragma: no cover
+    fcntl = None
+    _LOCK_SH = _LOCK_EX = None
+else:
+    _LOCK_SH = fcntl.LOCK_SH
+    _LOCK_EX = fcntl.LOCK_EX
+
+
+FORMAT = 3
+
+_kinds = dict(
+    (int(kind), kind) for kind in (
+        _util.funcsigs.Parameter.POSITIONAL_ONLY,
+        _util.funcsigs.Parameter.POSITIONAL_OR_KEYWORD,
+        _util.funcsigs.Parameter.VAR_POSITIONAL,
+        _util.funcsigs.Parameter.KEYWORD_ONLY,
+        _util.funcsigs.Parameter.VAR_KEYWORD,
+        ))
+
+_empty = _util.funcsigs.Parameter.empty
+
+
+class Unserializable(ValueError):
+    pass
+
+
+def qualified_name(obj):
+    """Returns the ``module:qualname`` that `resolve` finds ``obj`` under,
+    or `None`."""
+    module = getattr(obj, '__module__', None)
+    name = getattr(obj, '__qualname__', None)
+    if name is None:
+        name = getattr(obj, '__name__', None)
+    if not isinstance(module, str) or not isinstance(name, str):
+        return None
+    if '<' in name:
+        return None
+    return '{0}:{1}'.format(module, name)
+
+
+def resolve(name):
+    """Finds the object named by `qualified_name` among the modules already
+    imported. Raises `LookupError` if it can't be found."""
+    module, _, path = name.partition(':')
+    try:
+        obj = sys.modules[module]
+    except KeyError:
+        raise LookupError(name)
+    for attr in path.split('.'):
+        try:
+            obj = vars(obj)[attr]
+        except (KeyError, TypeError):
+            raise LookupError(name)
+        if isinstance(obj, (staticmethod, classmethod)):
+            obj = obj.__func__
+    return obj
+
+
+def _code(obj):
+    obj = getattr(obj, '__func__', obj)
+    return getattr(obj, '__code__', None)
+
+
+_code_hashes = weakref.WeakKeyDictionary()
+_func_hashes = weakref.WeakKeyDictionary()
+
+
+def _code_digest(code):
+    try:
+        return _code_hashes[code]
+    except KeyError:
+        pass
+    ret = _code_hashes[code] = hashlib.sha1(marshal.dumps(code)).hexdigest()
+    return ret
+
+
+def _stable_repr(value):
+    # literals are restored from their repr by _load_value, other values
+    # are matched against the live callable, so only their type is hashed
+    ret = repr(value)
+    try:
+        if repr(ast.literal_eval(ret)) == ret:
+            return ret
+    except (ValueError, SyntaxError, TypeError, MemoryError):
+        pass
+    return '<{0}.{1}>'.format(
+        type(value).__module__, getattr(
+            type(value), '__qualname__', type(value).__name__))
+
+
+def _annotations(func):
+    try:
+        return getattr(func, '__annotations__', None)
+    except Exception:
+        return None
+
+
+def code_hash(obj):
+    """Hashes the code of the function ``obj`` along with its defaults and
+    annotations. Returns `None` for objects that have none."""
+    func = getattr(obj, '__func__', obj)
+    code = _code(func)
+    if not isinstance(code, types.CodeType):
+        return None
+    parts = (
+        code, getattr(func, '__defaults__', None),
+        getattr(func, '__kwdefaults__', None), _annotations(func))
+    try:
+        cached = _func_hashes[func]
+    except (KeyError, TypeError):
+        pass
+    else:
+        if all(a is b for a, b in zip(cached, parts)):
+            return cached[-1]
+    defaults, kwdefaults, annotations = parts[1:]
+    digest = hashlib.sha1(_code_digest(code).encode('ascii'))
+    for value in defaults or ():
+        digest.update('{0};'.format(_stable_repr(value)).encode('utf-8'))
+    for items in (kwdefaults, annotations):
+        digest.update(b'|')
+        for name, value in sorted((items or {}).items()):
+            digest.update('{0}={1};'.format(
+                name, _stable_repr(value)).encode('utf-8'))
+    ret = digest.hexdigest()
+    try:
+        _func_hashes[func] = parts + (ret,)
+    except TypeError:
+        pass
+    return ret
+
+
+_module_hashes = weakref.WeakKeyDictionary()
+
+
+def _module_digest(module):
+    try:
+        path = inspect.getsourcefile(module) or module.__file__
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (AttributeError, TypeError, IOError, OSError):
+        return None
+
+
+def module_hash(name):
+    """Hashes the source of the imported module ``name``, or the file it
+    was loaded from if its source isn't available. Returns `None` if it
+    isn't imported or has no file.
+
+    The file is read once each time the module is imported, or reloaded
+    on Python 3, so the hash is that of the code that is running even if
+    the file is changed afterwards."""
+    try:
+        module = sys.modules[name]
+    except KeyError:
+        return None
+    spec = getattr(module, '__spec__', None)
+    try:
+        cached_spec, ret = _module_hashes[module]
+    except (KeyError, TypeError):
+        pass
+    else:
+        if cached_spec is spec:
+            return ret
+    ret = _module_digest(module)
+    try:
+        _module_hashes[module] = spec, ret
+    except TypeError:
+        pass
+    return ret
+
+
+def _module_name(name):
+    return name.partition(':')[0]
+
+
+def _callable_name(obj):
+    name = qualified_name(obj)
+    if (name is None or code_hash(obj) is None
+            or module_hash(_module_name(name)) is None):
+        raise Unserializable(obj)
+    try:
+        if resolve(name) is not obj:
+            raise Unserializable(obj)
+    except LookupError:
+        raise Unserializable(obj)
+    return name
+
+
+def _dump_value(value):
+    if value is _empty:
+        return None
+    return repr(value)
+
+
+def dump_signature(sig, obj):
+    """Returns a JSON-compatible form of ``sig``, the signature of ``obj``.
+
+    Raises `Unserializable` unless ``obj`` and every callable in
+    ``sig.sources`` are functions that `resolve` can find, defined in
+    modules loaded from a file."""
+    names = {}
+    def name(func):
+        try:
+            return names[func]
+        except KeyError:
+            ret = names[func] = _callable_name(func)
+            return ret
+    sources = getattr(sig, 'sources', {})
+    return {
+        'name': name(obj),
+        'params': [
+            [param.name, int(param.kind),
+             _dump_value(param.default), _dump_value(param.annotation)]
+            for param in sig.parameters.values()],
+        'return': _dump_value(sig.return_annotation),
+        'sources': dict(
+            (pname, [name(func) for func in funcs])
+            for pname, funcs in sources.items() if pname != '+depths'),
+        'depths': dict(
+            (name(func), depth)
+            for func, depth in sources.get('+depths', {}).items()),
+        'hashes': dict(
+            (fname, code_hash(func)) for func, fname in names.items()),
+        'modules': dict(
+            (_module_name(fname), module_hash(_module_name(fname)))
+            for fname in names.values()),
+        }
+
+
+def _load_value(stored, candidates):
+    # the live callables come first so that mutable defaults such as []
+    # are the very objects the functions use
+    if stored is None:
+        return _empty
+    for value in candidates:
+        if value is not _empty and repr(value) == stored:
+            return value
+    try:
+        value = ast.literal_eval(stored)
+    except (ValueError, SyntaxError, TypeError, MemoryError):
+        pass
+    else:
+        if repr(value) == stored:
+            return value
+    raise Unserializable(stored)
+
+
+def load_signature(data):
+    """Rebuilds the signature stored by `dump_signature`. Raises
+    `Unserializable` if a callable it refers to can't be found or its code
+    or the source of its module changed."""
+    for mname, expected in data['modules'].items():
+        if module_hash(mname) != expected:
+            raise Unserializable(mname)
+    funcs = {}
+    for fname, expected in data['hashes'].items():
+        try:
+            func = resolve(fname)
+        except LookupError:
+            raise Unserializable(fname)
+        if code_hash(func) != expected:
+            raise Unserializable(fname)
+        funcs[fname] = func
+    sources = dict(
+        (pname, _signatures._new_source_list(
+            [funcs[fname] for fname in fnames]))
+        for pname, fnames in data['sources'].items())
+    sources['+depths'] = _signatures._new_depths(
+        (funcs[fname], depth) for fname, depth in data['depths'].items())
+    plain = {}
+    def origins(pname):
+        for func in sources.get(pname, ()):
+            try:
+                sig = plain[func]
+            except KeyError:
+                try:
+                    sig = plain[func] = _util.funcsigs.signature(func)
+                except (TypeError, ValueError):
+                    continue
+            try:
+                yield sig.parameters[pname]
+            except KeyError:
+                pass
+    params = []
+    for pname, kind, default, annotation in data['params']:
+        params.append(_util.funcsigs.Parameter(
+            pname, _kinds[kind],
+            default=_load_value(
+                default, (p.default for p in origins(pname))),
+            annotation=_load_value(
+                annotation, (p.annotation for p in origins(pname)))))
+    own = funcs[data['name']]
+    return _signatures.Signature(
+        params,
+        return_annotation=_load_value(
+            data['return'], [_return_annotation(own)]),
+        sources=sources)
+
+
+def _return_annotation(func):
+    try:
+        return _util.funcsigs.signature(func).return_annotation
+    except (TypeError, ValueError):
+        return _empty
+
+
+def signature_key(obj, auto):
+    """Returns the key that the signature of ``obj`` is stored under, or
+    `None` if it can't be stored."""
+    name = qualified_name(obj)
+    if name is None:
+        return None
+    return '{0}:{1}'.format(name, int(bool(auto)))
+
+
+def _load_for(data, obj):
+    try:
+        sig = load_signature(data)
+    except (Unserializable, LookupError, KeyError, TypeError, ValueError):
+        return None
+    if sig.sources['+depths'].get(obj) != 0:
+        # another object with the same qualified name
+        return None
+    return sig
+
+
+def manifest_key(obj, auto):
+    """Returns the key that the signature of ``obj`` is listed under in a
+    manifest, made of its `signature_key` and a hash of its `code_hash` and
+    the `module_hash` of its module, or `None` if it can't be listed."""
+    key = signature_key(obj, auto)
+    if key is None:
+        return None
+    digest = code_hash(obj)
+    mdigest = module_hash(_module_name(key))
+    if digest is None or mdigest is None:
+        return None
+    return '{0}:{1}'.format(key, hashlib.sha1(
+        '{0}:{1}'.format(digest, mdigest).encode('ascii')).hexdigest())
+
+
+def _read_entries(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('format') != FORMAT:
+        return {}
+    return data.get('entries', {})
+
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _write_entries(path, entries):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'format': FORMAT, 'entries': entries}, f,
+                      sort_keys=True, separators=(',', ':'))
+        _replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SignatureManifest(object):
+    """Read-only set of signatures generated ahead of time, for instance
+    by ``python -m sigtools.manifest`` when building a package.
+
+    Entries are found by `manifest_key`, so a function whose code or module
+    source changed since the manifest was generated is simply not found, and
+    its signature is computed as usual. The entries found are checked like
+    those of `PersistentCache`.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.entries = {}
+        self.loaded = {}
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def load(self, path):
+        """Starts using the manifest at ``path``."""
+        self.path = path
+        self.entries = _read_entries(path)
+        self.loaded = {}
+
+    def unload(self):
+        """Stops using the manifest."""
+        self.path = None
+        self.entries = {}
+        self.loaded = {}
+
+    def get(self, obj, auto):
+        """Returns the listed signature of ``obj``, or `None`."""
+        key = manifest_key(obj, auto)
+        if key is None:
+            return None
+        try:
+            return self.loaded[key]
+        except KeyError:
+            pass
+        try:
+            data = self.entries[key]
+        except KeyError:
+            return None
+        sig = _load_for(data, obj)
+        if sig is not None:
+            self.loaded[key] = sig
+        return sig
+
+    def put(self, obj, auto, sig):
+        pass
+
+
+class PersistentCache(object):
+    """Keeps the signatures computed by `forged_signature` in a file, so
+    that later processes can load them instead of recomputing them.
+
+    Only lookups made without ``args`` or ``kwargs``, on functions that can
+    be found again by qualified name, are stored. An entry
+    is used only if the code of every function involved and the source of
+    the modules they are defined in still hash the same, so editing any of
+    them invalidates it.
+
+    Entries are written to the file when `save` is called, or when the
+    process exits.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.entries = {}
+        self.loaded = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self._registered = False
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        """Starts using the cache file at ``path``, loading the entries
+        already in it."""
+        self.path = path
+        self.entries = _read_entries(path)
+        self.loaded = {}
+        self.dirty = False
+        if not self._registered:
+            atexit.register(self.save)
+            self._registered = True
+
+    def disable(self):
+        """Saves pending entries and stops using the cache file."""
+        self.save()
+        self.path = None
+        self.entries = {}
+        self.loaded = {}
+
+    def get(self, obj, auto):
+        """Returns the stored signature of ``obj``, or `None`."""
+        key = signature_key(obj, auto)
+        if key is None:
+            return None
+        try:
+            return self.loaded[key]
+        except KeyError:
+            pass
+        try:
+            data = self.entries[key]
+        except KeyError:
+            return None
+        sig = _load_for(data, obj)
+        if sig is not None:
+            self.loaded[key] = sig
+        return sig
+
+    def put(self, obj, auto, sig):
+        """Stores ``sig`` as the signature of ``obj`` if it can be."""
+        key = signature_key(obj, auto)
+        if key is None:
+            return
+        try:
+            data = dump_signature(sig, obj)
+        except Unserializable:
+            return
+        with self.lock:
+            self.entries[key] = data
+            self.loaded[key] = sig
+            self.dirty = True
+
+    def save(self):
+        """Writes the entries to the cache file if any were added."""
+        with self.lock:
+            if self.path is None or not self.dirty:
+                return
+            entries = dict(_read_entries(self.path))
+            entries.update(self.entries)
+            _write_entries(self.path, entries)
+            self.dirty = False
+
+
+signature_manifest = SignatureManifest()
+persistent_cache = PersistentCache()
+
+
+class SharedSignatureStore(object):
+    """Signature store backed by a memory-mapped file, for processes that
+    share their signatures, such as the workers of a prefork server.
+
+    The file holds a header followed by an append-only log of entries in
+    the format of `dump_signature`. Each process only keeps an index from
+    keys to offsets in the file, which it updates when a key is missing.
+    A signature added by any process is visible to all others attached to
+    the same file, including processes forked after `attach` was called.
+
+    Writers are serialized with ``fcntl.lockf`` record locks where
+    available. These are held per process, so they also exclude the
+    processes forked from one that attached the store. Once the file is
+    full, no more entries are added. Records that can't be read, for
+    instance ones left incomplete by a crashed writer, are skipped.
+    """
+
+    magic = b'SIGTSHM1'
+    header = struct.Struct('<8sQ')
+    length = struct.Struct('<I')
+
+    def __init__(self):
+        self.file = None
+        self.map = None
+        self.index = {}
+        self.loaded = {}
+        self.scanned = self.header.size
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.map is not None
+
+    def attach(self, path, size=16 * 1024 * 1024):
+        """Maps the store at ``path``, creating it with room for ``size``
+        bytes if it doesn't exist yet."""
+        self.detach()
+        f = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+        try:
+            with _file_lock(f, _LOCK_EX):
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self.header.size:
+                    f.truncate(size)
+                    f.seek(0)
+                    f.write(self.header.pack(self.magic, self.header.size))
+                    f.flush()
+            self.map = mmap.mmap(f.fileno(), 0)
+        except BaseException:
+            f.close()
+            raise
+        self.file = f
+        magic, _ = self.header.unpack_from(self.map, 0)
+        if magic != self.magic:
+            self.detach()
+            raise ValueError('{0!r} is not a signature store'.format(path))
+        self.index = {}
+        self.loaded = {}
+        self.scanned = self.header.size
+
+    def detach(self):
+        """Unmaps the store."""
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+        self.map = self.file = None
+        self.index = {}
+        self.loaded = {}
+
+    def _end(self):
+        with _file_lock(self.file, _LOCK_SH):
+            return min(self.header.unpack_from(self.map, 0)[1],
+                       len(self.map))
+
+    def _scan(self):
+        end = self._end()
+        offset = self.scanned
+        while offset + self.length.size <= end:
+            length, = self.length.unpack_from(self.map, offset)
+            start = offset + self.length.size
+            if not length or start + length > end:
+                # the lengths that follow can't be trusted either
+                break
+            offset = start + length
+            key_end = self.map.find(b'\0', start, offset)
+            if key_end < 0:
+                continue
+            try:
+                key = self.map[start:key_end].decode('utf-8')
+            except UnicodeDecodeError:
+                continue
+            self.index[key] = key_end + 1, offset
+        self.scanned = end
+
+    def get(self, obj, auto):
+        """Returns the stored signature of ``obj``, or `None`."""
+        key = signature_key(obj, auto)
+        if key is None:
+            return None
+        with self.lock:
+            if key not in self.index:
+                self._scan()
+            try:
+                span = self.index[key]
+            except KeyError:
+                return None
+            try:
+                loaded_span, sig = self.loaded[key]
+            except KeyError:
+                pass
+            else:
+                if (loaded_span == span
+                        and sig.sources['+depths'].get(obj) == 0):
+                    return sig
+            start, end = span
+            try:
+                data = json.loads(self.map[start:end].decode('utf-8'))
+            except ValueError:
+                # includes UnicodeDecodeError
+                del self.index[key]
+                return None
+            sig = _load_for(data, obj)
+            if sig is not None:
+                self.loaded[key] = span, sig
+        return sig
+
+    def put(self, obj, auto, sig):
+        """Adds ``sig`` as the signature of ``obj`` if it can be stored and
+        there is room left."""
+        key = signature_key(obj, auto)
+        if key is None:
+            return
+        try:
+            data = dump_signature(sig, obj)
+        except Unserializable:
+            return
+        payload = (key.encode('utf-8') + b'\0'
+                   + json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        with self.lock:
+            with _file_lock(self.file, _LOCK_EX):
+                end = self.header.unpack_from(self.map, 0)[1]
+                new_end = end + self.length.size + len(payload)
+                if new_end > len(self.map):
+                    return
+                self.length.pack_into(self.map, end, len(payload))
+                self.map[end + self.length.size:new_end] = payload
+                self.header.pack_into(self.map, 0, self.magic, new_end)
+
+
+class _file_lock(object):
+    # record locks rather than flock, which forked processes would share
+    # through the inherited file description
+    def __init__(self, f, operation):
+        self.fileno = f.fileno()
+        self.operation = operation
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.lockf(self.fileno, self.operation)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.lockf(self.fileno, fcntl.LOCK_UN)
+
+
+shared_store = SharedSignatureStore()
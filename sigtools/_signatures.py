@@ -19,7 +19,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import types
+import weakref
 import itertools
+import threading
+import contextlib
 import collections
 from functools import partial
 
@@ -30,9 +34,214 @@ try:
 except AttributeError: # pragma: no cover
     zip_longest = itertools.zip_longest
 
+try:
+    from collections.abc import Sequence, MutableMapping
+except ImportError: # pragma: no cover
+    from collections import Sequence, MutableMapping
+
+try:
+    _WeakMethod = weakref.WeakMethod
+except AttributeError: # pragma: no cover
+    def _WeakMethod(method):
+        raise TypeError
+
+
+class SourceList(list):
+    """The callables a parameter comes from, as listed in
+    `Signature.sources`.
+
+    Signatures derived from one another share the lists of the parameters
+    whose sources didn't change, so these lists can't be modified in
+    place. Assign a new list to the parameter's entry instead.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(
+            'Lists of sources are shared between signatures and cannot be '
+            'modified. Assign a new list instead.')
+
+    append = extend = insert = remove = pop = sort = reverse = _immutable
+    clear = __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    __setslice__ = __delslice__ = _immutable
+
+    def __reduce__(self):
+        return SourceList, (list(self),)
+
+
+def _weak(obj, weak=None):
+    if weak is not None and not weak(obj):
+        return obj
+    if isinstance(obj, types.MethodType):
+        # bound methods are created anew on each access
+        try:
+            return _WeakMethod(obj)
+        except TypeError:
+            return obj
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        return obj
+
+
+_dead = object()
+
+
+def _deref(ref):
+    if isinstance(ref, weakref.ref):
+        obj = ref()
+        return _dead if obj is None else obj
+    return ref
+
+
+class WeakSourceList(Sequence):
+    """Like `SourceList`, but only holds weak references to the callables
+    that support them, see `SourceTracking.enable`.
+
+    Callables that were garbage-collected are left out, and the references
+    to them are dropped the next time the list is read. If ``weak`` is
+    given, only the callables for which it returns true are held weakly.
+    """
+
+    __slots__ = ('_refs',)
+
+    def __init__(self, funcs=(), weak=None):
+        self._refs = [_weak(func, weak) for func in funcs]
+
+    def _live(self):
+        funcs = [_deref(ref) for ref in self._refs]
+        if _dead in funcs:
+            self._refs = [
+                ref for ref, func in zip(self._refs, funcs)
+                if func is not _dead]
+            funcs = [func for func in funcs if func is not _dead]
+        return funcs
+
+    def __iter__(self):
+        return iter(self._live())
+
+    def __len__(self):
+        return len(self._live())
+
+    def __getitem__(self, index):
+        return self._live()[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, Sequence)):
+            return NotImplemented
+        return self._live() == list(other)
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return self._live() + list(other)
+
+    def __repr__(self):
+        return repr(self._live())
+
+    def __reduce__(self):
+        return WeakSourceList, (self._live(),)
+
+
+class WeakDepths(MutableMapping):
+    """The ``'+depths'`` entry of `Signature.sources` when sources only
+    hold weak references, see `SourceTracking.enable`.
+
+    Entries for callables that were garbage-collected are dropped the next
+    time the mapping is iterated over. If ``weak`` is given, only the
+    callables for which it returns true are held weakly.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, items=(), weak=None):
+        self._data = {}
+        for func, depth in items:
+            self._data[_weak(func, weak)] = depth
+
+    def _key(self, func):
+        ref = _weak(func)
+        if ref not in self._data and func in self._data:
+            # held strongly
+            return func
+        return ref
+
+    def __getitem__(self, func):
+        return self._data[self._key(func)]
+
+    def __setitem__(self, func, depth):
+        self._data[self._key(func)] = depth
+
+    def __delitem__(self, func):
+        del self._data[self._key(func)]
+
+    def __iter__(self):
+        live = []
+        for ref in list(self._data):
+            func = _deref(ref)
+            if func is _dead:
+                del self._data[ref]
+            else:
+                live.append(func)
+        return iter(live)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return WeakDepths, (list(self.items()),)
+
+
+def weak_sources(sources, weak=None):
+    """Returns a copy of ``sources`` that only holds weak references to the
+    callables that support them, or if ``weak`` is given, to those for
+    which it returns true. The entries that hold none of those are left as
+    they are."""
+    ret = {}
+    for name, funcs in sources.items():
+        if weak is not None and not any(weak(func) for func in funcs):
+            ret[name] = funcs
+        elif name == '+depths':
+            ret[name] = WeakDepths(funcs.items(), weak)
+        elif type(funcs) is WeakSourceList:
+            ret[name] = funcs
+        else:
+            ret[name] = WeakSourceList(funcs, weak)
+    return ret
+
+
+def _new_source_list(funcs):
+    if source_tracking.weak:
+        return WeakSourceList(funcs)
+    return SourceList(funcs)
+
+
+def _source_list(funcs):
+    # returns funcs itself if it can be shared
+    funcs_type = type(funcs)
+    if funcs_type is WeakSourceList:
+        return funcs
+    if funcs_type is SourceList and not source_tracking.weak:
+        return funcs
+    return _new_source_list(funcs)
+
+
+def _new_depths(items=()):
+    if source_tracking.weak:
+        return WeakDepths(items)
+    return dict(items)
+
 
 class Signature(_util.funcsigs.Signature):
-    __slots__ = _util.funcsigs.Signature.__slots__ + ('sources',)
+    __slots__ = _util.funcsigs.Signature.__slots__ + ('sources', '_layout')
 
     def __init__(self, *args, **kwargs):
         self.sources = kwargs.pop('sources', {})
@@ -56,38 +265,347 @@ class Signature(_util.funcsigs.Signature):
         ret.sources = sources
         return ret
 
+    def freeze(self):
+        """Returns a `FrozenSignature` with the same parameters, return
+        annotation and sources."""
+        return FrozenSignature(
+            self.parameters.values(),
+            return_annotation=self.return_annotation,
+            sources=self.sources, __validate_parameters__=False)
 
-def default_sources(sig, obj):
-    srcs = dict((pname, [obj]) for pname in sig.parameters)
-    srcs['+depths'] = {obj: 0}
+
+def structural_key(sig):
+    """Returns a key that is the same for two signatures if they have the
+    same parameter names and kinds, in the same order, and the very same
+    defaults, annotations and return annotation. Sources aren't taken into
+    account.
+
+    The key refers to defaults and annotations by `id`, so it must not
+    outlive ``sig``."""
+    return (
+        tuple([(param.name, int(param.kind), id(param.default),
+                id(param.annotation))
+               for param in sig.parameters.values()]),
+        id(sig.return_annotation))
+
+
+class FrozenSources(dict):
+    """The `Signature.sources` of a `FrozenSignature`, which can't be
+    modified. Its ``'+depths'`` entry can't be either."""
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('The sources of a frozen signature cannot be '
+                        'modified. Use thaw() to get a modifiable copy.')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = _immutable
+    setdefault = update = _immutable
+
+    def __reduce__(self):
+        return FrozenSources, (dict(self),)
+
+
+def _freeze_sources(sources):
+    if type(sources) is FrozenSources:
+        return sources
+    ret = dict(sources)
+    depths = ret.get('+depths')
+    if depths is not None:
+        ret['+depths'] = (
+            WeakDepths(depths.items()) if type(depths) is WeakDepths
+            else FrozenSources(depths))
+    return FrozenSources(ret)
+
+
+def _thaw_sources(sources):
+    if type(sources) is not FrozenSources:
+        return sources
+    ret = dict(sources)
+    depths = ret.get('+depths')
+    if depths is not None:
+        ret['+depths'] = (
+            WeakDepths(depths.items()) if type(depths) is WeakDepths
+            else dict(depths))
+    return ret
+
+
+def _value_hash(value):
+    try:
+        return hash(value)
+    except TypeError:
+        # equal values of an unhashable type still hash alike
+        return hash(type(value))
+
+
+class FrozenSignature(Signature):
+    """Signature that can't be modified and can be used as a dictionary key.
+
+    Its hash is computed once from its parameters, defaults and annotations,
+    and it compares like `inspect.Signature`. Two frozen signatures with
+    the same `structural_key` are equal without comparing their defaults
+    and annotations. Its `sources <Signature.sources>` are a
+    `FrozenSources` copy of those it was created with.
+    """
+
+    __slots__ = ('key', '_hash')
+
+    def __init__(self, *args, **kwargs):
+        if 'sources' in kwargs:
+            kwargs['sources'] = _freeze_sources(kwargs['sources'])
+        super(FrozenSignature, self).__init__(*args, **kwargs)
+        key = structural_key(self)
+        object.__setattr__(self, '_hash', hash((
+            tuple([(param.name, int(param.kind),
+                    _value_hash(param.default),
+                    _value_hash(param.annotation))
+                   for param in self.parameters.values()]),
+            _value_hash(self.return_annotation))))
+        object.__setattr__(self, 'key', key)
+
+    def __setattr__(self, name, value):
+        try:
+            self.key
+        except AttributeError:
+            super(FrozenSignature, self).__setattr__(name, value)
+        else:
+            raise AttributeError(
+                "can't set attribute {0!r} of a frozen signature"
+                .format(name))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenSignature):
+            if self._hash != other._hash:
+                return False
+            if self.key == other.key:
+                return True
+        return super(FrozenSignature, self).__eq__(other)
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        if ret is NotImplemented:
+            return ret
+        return not ret
+
+    def __reduce__(self):
+        # inspect.Signature restores its state through setattr
+        return _frozen_signature, (
+            list(self.parameters.values()), self.return_annotation,
+            self.sources)
+
+    def freeze(self):
+        return self
+
+    def thaw(self):
+        """Returns a modifiable `Signature` equal to this one."""
+        return Signature(
+            self.parameters.values(),
+            return_annotation=self.return_annotation,
+            sources=_thaw_sources(self.sources),
+            __validate_parameters__=False)
+
+    def replace(self, *args, **kwargs):
+        kwargs.setdefault('sources', self.sources)
+        return self.thaw().replace(*args, **kwargs).freeze()
+
+
+def _frozen_signature(parameters, return_annotation, sources):
+    return FrozenSignature(
+        parameters, return_annotation=return_annotation, sources=sources,
+        __validate_parameters__=False)
+
+
+class SourceTracking(object):
+    """Whether `Signature.sources` are computed by `signature`, `merge`,
+    `embed`, `mask` and `forwards`.
+
+    Tracking is enabled by default. When it is off, none of the bookkeeping
+    needed to compute sources is done, and the signatures computed have
+    empty ``sources``. The ``sources`` argument of each of these
+    functions overrides this setting for one call.
+
+    Sources can also be tracked with weak references only, see `enable`.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.weak = False
+        self._local = threading.local()
+
+    def enable(self, weak=False):
+        """Starts computing sources.
+
+        If ``weak`` is true, the sources of the signatures computed from
+        then on only hold weak references to callables, so that signatures
+        kept in caches don't keep the callables they were computed from
+        alive. Callables that were garbage-collected are left out of the
+        sources. Callables that can't be weakly referenced are still held
+        strongly.
+        """
+        self.enabled = True
+        self.weak = weak
+
+    def disable(self):
+        """Stops computing sources."""
+        self.enabled = False
+
+    @property
+    def active(self):
+        """Whether sources are computed in this thread right now."""
+        override = getattr(self._local, 'override', None)
+        if override is None:
+            return self.enabled
+        return override
+
+    @contextlib.contextmanager
+    def scope(self, sources):
+        """Overrides the setting in this thread within a ``with`` block.
+        `None` leaves it unchanged."""
+        if sources is None:
+            yield
+            return
+        previous = getattr(self._local, 'override', None)
+        self._local.override = bool(sources)
+        try:
+            yield
+        finally:
+            self._local.override = previous
+
+
+source_tracking = SourceTracking()
+
+
+def _sources_option(kwargs):
+    sources = kwargs.pop('sources', None)
+    if kwargs:
+        raise TypeError('Unexpected keyword arguments: {0}'.format(
+            ', '.join(sorted(kwargs))))
+    return sources
+
+
+def _named_sources(names, obj):
+    srcs = dict.fromkeys(names, _new_source_list((obj,)))
+    srcs['+depths'] = _new_depths([(obj, 0)])
     return srcs
 
 
+def default_sources(sig, obj):
+    return _named_sources(sig.parameters, obj)
+
+
 def set_default_sources(sig, obj):
     """Assigns the source of every parameter of sig to obj"""
     return Signature.upgrade(sig, default_sources(sig, obj))
 
 
-def signature(obj):
+_FunctionType = type(default_sources)
+_Parameter = _util.funcsigs.Parameter
+_empty = _Parameter.empty
+_POSITIONAL_ONLY = _Parameter.POSITIONAL_ONLY
+_POSITIONAL_OR_KEYWORD = _Parameter.POSITIONAL_OR_KEYWORD
+_VAR_POSITIONAL = _Parameter.VAR_POSITIONAL
+_KEYWORD_ONLY = _Parameter.KEYWORD_ONLY
+_VAR_KEYWORD = _Parameter.VAR_KEYWORD
+_CO_VARARGS = 0x04
+_CO_VARKEYWORDS = 0x08
+
+
+def function_signature(func):
+    """Builds the signature of a plain Python function directly from its
+    code object, with the same result as `inspect.signature`. Returns
+    `None` for other callables and for functions that `inspect.signature`
+    would treat specially, such as those with a ``__wrapped__`` or
+    ``__signature__`` attribute."""
+    if type(func) is not _FunctionType:
+        return None
+    attrs = func.__dict__
+    if attrs and ('__wrapped__' in attrs or '__signature__' in attrs):
+        return None
+    code = func.__code__
+    names = code.co_varnames
+    pos_count = code.co_argcount
+    posonly_count = getattr(code, 'co_posonlyargcount', 0)
+    kwonly_count = getattr(code, 'co_kwonlyargcount', 0)
+    defaults = func.__defaults__ or ()
+    kwdefaults = getattr(func, '__kwdefaults__', None) or {}
+    annotations = getattr(func, '__annotations__', None) or {}
+    get_annotation = annotations.get
+    params = []
+    first_default = pos_count - len(defaults)
+    for i, name in enumerate(names[:pos_count]):
+        if not isinstance(name, str) or name.startswith('.'):
+            # tuple parameters
+            return None
+        params.append(_Parameter(
+            name,
+            _POSITIONAL_ONLY if i < posonly_count else _POSITIONAL_OR_KEYWORD,
+            default=defaults[i - first_default] if i >= first_default
+                else _empty,
+            annotation=get_annotation(name, _empty)))
+    index = pos_count + kwonly_count
+    if code.co_flags & _CO_VARARGS:
+        name = names[index]
+        params.append(_Parameter(
+            name, _VAR_POSITIONAL, annotation=get_annotation(name, _empty)))
+        index += 1
+    for name in names[pos_count:pos_count + kwonly_count]:
+        params.append(_Parameter(
+            name, _KEYWORD_ONLY, default=kwdefaults.get(name, _empty),
+            annotation=get_annotation(name, _empty)))
+    if code.co_flags & _CO_VARKEYWORDS:
+        name = names[index]
+        params.append(_Parameter(
+            name, _VAR_KEYWORD, annotation=get_annotation(name, _empty)))
+    if source_tracking.active:
+        sources = _named_sources(names[:len(params)], func)
+    else:
+        sources = {}
+    return Signature(
+        params, return_annotation=annotations.get('return', _empty),
+        sources=sources, __validate_parameters__=False)
+
+
+def _plain_signature(obj):
+    sig = function_signature(obj)
+    if sig is None:
+        sig = _util.funcsigs.signature(obj)
+        if source_tracking.active:
+            sig = set_default_sources(sig, obj)
+        else:
+            sig = Signature.upgrade(sig, {})
+    return sig
+
+
+def signature(obj, sources=None):
     """Retrieves to unmodified signature from ``obj``, without taking
     `sigtools.specifiers` decorators into account or attempting automatic
     signature discovery.
+
+    :param bool sources: Whether to compute the signature's ``sources``.
+        Defaults to the setting of `source_tracking`.
     """
-    if isinstance(obj, partial):
-        sig = _util.funcsigs.signature(obj.func)
-        sig = set_default_sources(sig, obj.func)
-        return _mask(sig, len(obj.args), False, False, False, False,
-                     obj.keywords or {}, obj)
-    sig =_util.funcsigs.signature(obj)
-    return set_default_sources(sig, obj)
+    with source_tracking.scope(sources):
+        if isinstance(obj, partial):
+            sig = _plain_signature(obj.func)
+            return _mask(sig, len(obj.args), False, False, False, False,
+                         obj.keywords or {}, obj)
+        return _plain_signature(obj)
 
 
 def copy_sources(src, func_swap={}, increase=False):
-    ret = dict(
-        (k, [func_swap.get(f, f) for f in v])
-        for k, v in src.items()
-        if k != '+depths')
-    ret['+depths'] = dict(
+    # the lists of sources that don't change are shared
+    ret = {}
+    for k, v in src.items():
+        if k == '+depths':
+            continue
+        if func_swap and any(f in func_swap for f in v):
+            ret[k] = _new_source_list(func_swap.get(f, f) for f in v)
+        else:
+            ret[k] = _source_list(v)
+    ret['+depths'] = _new_depths(
         (func_swap.get(f, f), v + increase)
         for f, v in src.get('+depths', {}).items())
     return ret
@@ -119,30 +637,103 @@ def sort_params(sig, sources=False):
          None)
 
     """
-    posargs = []
-    pokargs = []
-    varargs = None
-    kwoargs = _util.OrderedDict()
-    varkwas = None
-    for param in sig.parameters.values():
-        if param.kind == param.POSITIONAL_ONLY:
-            posargs.append(param)
-        elif param.kind == param.POSITIONAL_OR_KEYWORD:
-            pokargs.append(param)
-        elif param.kind == param.VAR_POSITIONAL:
-            varargs = param
-        elif param.kind == param.KEYWORD_ONLY:
-            kwoargs[param.name] = param
-        elif param.kind == param.VAR_KEYWORD:
-            varkwas = param
-        else:
-            raise AssertionError('Unknown param kind {0}'.format(param.kind))
+    layout = parameter_layout(sig)
+    posargs = list(layout.posargs)
+    pokargs = list(layout.pokargs)
+    kwoargs = _util.OrderedDict(layout.kwoargs)
     if sources:
         src = getattr(sig, 'sources', {})
-        return SortedParameters(posargs, pokargs, varargs, kwoargs, varkwas,
-                                copy_sources(src))
+        return SortedParameters(posargs, pokargs, layout.varargs, kwoargs,
+                                layout.varkwargs, copy_sources(src))
     else:
-        return posargs, pokargs, varargs, kwoargs, varkwas
+        return posargs, pokargs, layout.varargs, kwoargs, layout.varkwargs
+
+
+class ParameterLayout(object):
+    """The parameters of a signature in one tuple, along with the offsets
+    at which each kind of parameter starts.
+
+    The parameters of a valid signature are already ordered by kind, so
+    each kind is a slice of that tuple.
+    """
+
+    __slots__ = ('params', 'pok_start', 'varargs_start', 'kwo_start',
+                 'varkwargs_start', '_kwoargs')
+
+    def __init__(self, params, offsets=None):
+        self.params = params
+        if offsets is None:
+            offsets = [0, 0, 0, 0]
+            for i, param in enumerate(params):
+                kind = param.kind
+                if kind == _POSITIONAL_ONLY:
+                    offsets[0] = offsets[1] = offsets[2] = offsets[3] = i + 1
+                elif kind == _POSITIONAL_OR_KEYWORD:
+                    offsets[1] = offsets[2] = offsets[3] = i + 1
+                elif kind == _VAR_POSITIONAL:
+                    offsets[2] = offsets[3] = i + 1
+                elif kind == _KEYWORD_ONLY:
+                    offsets[3] = i + 1
+                elif kind != _VAR_KEYWORD:
+                    raise AssertionError(
+                        'Unknown param kind {0}'.format(param.kind))
+        (self.pok_start, self.varargs_start,
+         self.kwo_start, self.varkwargs_start) = offsets
+        self._kwoargs = None
+
+    @property
+    def posargs(self):
+        return self.params[:self.pok_start]
+
+    @property
+    def pokargs(self):
+        return self.params[self.pok_start:self.varargs_start]
+
+    @property
+    def varargs(self):
+        if self.kwo_start > self.varargs_start:
+            return self.params[self.varargs_start]
+        return None
+
+    @property
+    def kwoargs(self):
+        """Keyword-only parameters by name. Must not be modified."""
+        if self._kwoargs is None:
+            self._kwoargs = _util.OrderedDict(
+                (param.name, param)
+                for param in self.params[self.kwo_start:self.varkwargs_start])
+        return self._kwoargs
+
+    @property
+    def varkwargs(self):
+        if len(self.params) > self.varkwargs_start:
+            return self.params[self.varkwargs_start]
+        return None
+
+
+def parameter_layout(sig):
+    """Returns the `ParameterLayout` of ``sig``, which is computed once
+    per `Signature`."""
+    try:
+        return sig._layout
+    except AttributeError:
+        pass
+    ret = ParameterLayout(tuple(sig.parameters.values()))
+    if isinstance(sig, Signature):
+        object.__setattr__(sig, '_layout', ret)
+    return ret
+
+
+def _sorted(sig):
+    # like sort_params(sig, sources=True), for callers that only read the
+    # parameters and sources
+    layout = parameter_layout(sig)
+    sources = None
+    if source_tracking.active:
+        sources = getattr(sig, 'sources', {})
+    return SortedParameters(
+        layout.posargs, layout.pokargs, layout.varargs, layout.kwoargs,
+        layout.varkwargs, sources)
 
 
 def apply_params(sig, posargs, pokargs, varargs, kwoargs, varkwargs,
@@ -155,16 +746,21 @@ def apply_params(sig, posargs, pokargs, varargs, kwoargs, varkwargs,
     parameters = []
     parameters.extend(posargs)
     parameters.extend(pokargs)
+    varargs_start = len(parameters)
     if varargs:
         parameters.append(varargs)
+    kwo_start = len(parameters)
     parameters.extend(kwoargs.values())
+    varkwargs_start = len(parameters)
     if varkwargs:
         parameters.append(varkwargs)
-    sig = sig.replace(parameters=parameters)
-    if sources is not None:
-        sig = Signature.upgrade(sig, sources)
-        sig.sources = sources
-    return sig
+    if sources is None:
+        return sig.replace(parameters=parameters)
+    ret = Signature(parameters, return_annotation=sig.return_annotation,
+                    sources=sources)
+    ret._layout = ParameterLayout(tuple(parameters), [
+        len(posargs), varargs_start, kwo_start, varkwargs_start])
+    return ret
 
 
 class IncompatibleSignatures(ValueError):
@@ -189,16 +785,25 @@ class IncompatibleSignatures(ValueError):
 
 
 def _add_sources(ret_src, name, *from_sources):
-    target = ret_src.setdefault(name, [])
-    target.extend(itertools.chain.from_iterable(
-        src.get(name, ()) for src in from_sources))
+    if ret_src is None:
+        return
+    found = [src[name] for src in from_sources if src.get(name)]
+    existing = ret_src.get(name)
+    if existing:
+        found.insert(0, existing)
+    if len(found) == 1:
+        ret_src[name] = _source_list(found[0])
+    else:
+        ret_src[name] = _new_source_list(
+            itertools.chain.from_iterable(found))
 
 def _add_all_sources(ret_src, params, from_source):
     """Adds the sources from from_source of all given parameters into the
     lhs sources multidict"""
+    if ret_src is None:
+        return
     for param in params:
-        ret_src.setdefault(param.name, []).extend(
-            from_source.get(param.name, ()))
+        _add_sources(ret_src, param.name, from_source)
 
 def _exclude_from_seq(seq, el):
     for i, x in enumerate(seq):
@@ -207,7 +812,7 @@ def _exclude_from_seq(seq, el):
             break
 
 def merge_depths(l, r):
-    ret = dict(l)
+    ret = _new_depths(l.items())
     for func, depth in r.items():
         if func in ret and depth > ret[func]:
             continue
@@ -215,10 +820,21 @@ def merge_depths(l, r):
     return ret
 
 
+def _merge_all_depths(sources):
+    ret = _new_depths()
+    for src in sources:
+        for func, depth in src.get('+depths', {}).items():
+            if func in ret and depth > ret[func]:
+                continue
+            ret[func] = depth
+    return ret
+
+
 class _Merger(object):
-    def __init__(self, left, right):
+    def __init__(self, left, right, deferred=False):
         self.l = left
         self.r = right
+        self.deferred = deferred
         self.performed = False
 
     def perform_once(self):
@@ -242,7 +858,13 @@ class _Merger(object):
             self.l.varkwargs,
             self.r.varkwargs
             ]
-        self.src = {'+depths': self._merge_depths()}
+        if not source_tracking.active:
+            self.src = None
+        elif self.deferred:
+            # depths are merged once by the caller
+            self.src = {}
+        else:
+            self.src = {'+depths': self._merge_depths()}
 
 
         self.l_unmatched_kwoargs = _util.OrderedDict()
@@ -251,8 +873,7 @@ class _Merger(object):
             if name in self.r.kwoargs:
                 self.kwoargs[name] = self._concile_meta(
                     param, self.r.kwoargs[name])
-                self.src[name] = list(itertools.chain(
-                    self.l.sources.get(name, ()), self.r.sources.get(name, ())))
+                _add_sources(self.src, name, self.l.sources, self.r.sources)
             else:
                 self.l_unmatched_kwoargs[param.name] = param
 
@@ -424,10 +1045,12 @@ class _Merger(object):
             annotation = left.annotation
         elif right.annotation != right.empty:
             annotation = right.annotation
+        if default is left.default and annotation is left.annotation:
+            return left
         return left.replace(default=default, annotation=annotation)
 
 
-def merge(*signatures):
+def merge(*signatures, **kwargs):
     """Tries to compute a signature for which a valid call would also validate
     the given signatures.
 
@@ -483,16 +1106,39 @@ def merge(*signatures):
             raise TypeError(msg) from None
         TypeError: 'alpha' parameter is positional only, but was passed as a keyword
 
+    Pass ``sources=False`` to skip computing the result's ``sources``, see
+    `source_tracking`.
+
     """
+    sources = _sources_option(kwargs)
     assert signatures, "Expected at least one signature"
-    ret = sort_params(signatures[0], sources=True)
+    with source_tracking.scope(sources):
+        return algebra_cache(_merge_all, signatures)
+
+
+def _merge_all(*signatures):
+    # the parameters are merged two signatures at a time, as the rules for
+    # each step depend on the result of the previous ones, but only in
+    # sorted form: a single Signature is built, and the depths of all the
+    # signatures are merged once at the end
+    ret = _sorted(signatures[0])
+    all_sources = [ret.sources]
     for i, sig in enumerate(signatures[1:], 1):
-        sorted_params = sort_params(sig, sources=True)
+        sorted_params = _sorted(sig)
+        all_sources.append(sorted_params.sources)
         try:
-            ret = SortedParameters(*_Merger(ret, sorted_params))
+            ret = SortedParameters(
+                *_Merger(ret, sorted_params, deferred=True))
         except ValueError:
             raise IncompatibleSignatures(sig, signatures[:i])
-    ret_sig = apply_params(signatures[0], *ret)
+    if not source_tracking.active:
+        src = {}
+    elif len(signatures) == 1:
+        src = copy_sources(ret.sources)
+    else:
+        src = ret.sources
+        src['+depths'] = _merge_all_depths(all_sources)
+    ret_sig = apply_params(signatures[0], *ret._replace(sources=src))
     return ret_sig
 
 
@@ -549,15 +1195,18 @@ def _embed(outer, inner, use_varargs=True, use_varkwargs=True, depth=1):
     _check_no_dupes(names, i_kwoargs.values())
     e_kwoargs.update(i_kwoargs)
 
-    src = dict(i_src, **o_src)
-    if o_varargs and use_varargs:
-        src.pop(o_varargs.name, None)
-    if o_varkwargs and use_varkwargs:
-        src.pop(o_varkwargs.name, None)
+    if i_src is None:
+        src = None
+    else:
+        src = dict(i_src, **o_src)
+        if o_varargs and use_varargs:
+            src.pop(o_varargs.name, None)
+        if o_varkwargs and use_varkwargs:
+            src.pop(o_varkwargs.name, None)
 
-    src['+depths'] = merge_depths(
-        o_src.get('+depths', {}),
-        dict((f, v+depth) for f, v in i_src.get('+depths', {}).items()))
+        src['+depths'] = merge_depths(
+            o_src.get('+depths', {}),
+            dict((f, v+depth) for f, v in i_src.get('+depths', {}).items()))
 
     return (
         e_posargs, e_pokargs, i_varargs if use_varargs else o_varargs,
@@ -565,7 +1214,7 @@ def _embed(outer, inner, use_varargs=True, use_varkwargs=True, depth=1):
         src
         )
 
-def embed(use_varargs=True, use_varkwargs=True, *signatures):
+def embed(use_varargs=True, use_varkwargs=True, *signatures, **kwargs):
     """Embeds a signature within another's ``*args`` and ``**kwargs``
     parameters, as if a function with the outer signature called a function with
     the inner signature with just ``f(*args, **kwargs)``.
@@ -594,22 +1243,31 @@ def embed(use_varargs=True, use_varkwargs=True, *signatures):
         ...         support.s('self, *args, keyword, **kwargs'), 1),
         ...     ))
         (self, *args, keyword, **kwargs)
+
+    Pass ``sources=False`` to skip computing the result's ``sources``, see
+    `source_tracking`.
     """
+    sources = _sources_option(kwargs)
     assert signatures
-    ret = sort_params(signatures[0], sources=True)
+    with source_tracking.scope(sources):
+        return algebra_cache(
+            _embed_all, (use_varargs, use_varkwargs) + signatures)
+
+
+def _embed_all(use_varargs, use_varkwargs, *signatures):
+    ret = _sorted(signatures[0])
     for i, sig in enumerate(signatures[1:], 1):
         try:
-            ret = _embed(ret, sort_params(sig, sources=True),
+            ret = _embed(ret, _sorted(sig),
                          use_varargs, use_varkwargs, i)
         except ValueError:
             raise IncompatibleSignatures(sig, signatures[:i])
-    return apply_params(signatures[0], *ret)
-
-
-def _pop_chain(*sequences):
-    for sequence in sequences:
-        while sequence:
-            yield sequence.pop(0)
+    sources = ret[5]
+    if not source_tracking.active:
+        sources = {}
+    elif len(signatures) == 1:
+        sources = copy_sources(sources)
+    return apply_params(signatures[0], *ret[:5], sources=sources)
 
 
 def _remove_from_src(src, ita):
@@ -624,10 +1282,26 @@ def _pnames(ita):
 
 def _mask(sig, num_args, hide_args, hide_kwargs,
           hide_varargs, hide_varkwargs, named_args, partial_obj):
-    posargs, pokargs, varargs, kwoargs, varkwargs, src \
-        = sort_params(sig, sources=True)
+    return apply_params(sig, *_mask_sorted(
+        sig, _sorted(sig), num_args, hide_args, hide_kwargs,
+        hide_varargs, hide_varkwargs, named_args, partial_obj))
+
+
+def _mask_sorted(sig, sorted_params, num_args, hide_args, hide_kwargs,
+                 hide_varargs, hide_varkwargs, named_args, partial_obj):
+    # like _mask, but takes and returns the sorted parameters of sig
+    posargs, pokargs, varargs, kwoargs, varkwargs, src = sorted_params
+    kwoargs = _util.OrderedDict(kwoargs)
+    tracking = source_tracking.active
+    # the lists of sources are never modified, only the mapping and the
+    # depths, which are copied along with it
+    if tracking:
+        src = dict(src)
+        if '+depths' in src:
+            src['+depths'] = _new_depths(src['+depths'].items())
+    else:
+        src = {}
 
-    pokargs_by_name = dict((p.name, p) for p in pokargs)
     consumed_names = set()
 
     if hide_args:
@@ -636,18 +1310,19 @@ def _mask(sig, num_args, hide_args, hide_kwargs,
         posargs = []
         pokargs = []
     elif num_args:
-        consume = num_args
-        for param in _pop_chain(posargs, pokargs):
-            consume -= 1
-            consumed_names.add(param.name)
-            if not consume:
-                break
-        else:
-            if not varargs:
-                raise ValueError(
-                    'Signature cannot be passed {0} arguments: {1}'
-                    .format(num_args, sig))
-
+        if num_args > len(posargs) + len(pokargs) and not varargs:
+            raise ValueError(
+                'Signature cannot be passed {0} arguments: {1}'
+                .format(num_args, sig))
+        # slice rather than pop parameters one by one, so that wide
+        # signatures are masked in linear time
+        rest = max(num_args - len(posargs), 0)
+        consumed_names.update(_pnames(posargs[:num_args]))
+        consumed_names.update(_pnames(pokargs[:rest]))
+        posargs = posargs[num_args:]
+        pokargs = pokargs[rest:]
+
+    pokargs_index = dict((p.name, i) for i, p in enumerate(pokargs))
     _remove_from_src(src, consumed_names)
 
     if hide_args or hide_varargs:
@@ -667,8 +1342,8 @@ def _mask(sig, num_args, hide_args, hide_kwargs,
     for kwarg_name in named_args:
         if kwarg_name in consumed_names:
             raise ValueError('Duplicate argument: {0!r}'.format(kwarg_name))
-        elif kwarg_name in pokargs_by_name:
-            i = pokargs.index(pokargs_by_name[kwarg_name])
+        elif kwarg_name in pokargs_index:
+            i = pokargs_index[kwarg_name]
             pokargs, param, conv_kwoargs = (
                 pokargs[:i], pokargs[i], pokargs[i+1:])
             kwoargs.update(
@@ -682,7 +1357,7 @@ def _mask(sig, num_args, hide_args, hide_kwargs,
             if varargs:
                 src.pop(varargs.name, None)
                 varargs = None
-            pokargs_by_name.clear()
+            pokargs_index.clear()
         elif kwarg_name in kwoargs:
             if partial_mode:
                 param = kwoargs[kwarg_name]
@@ -699,7 +1374,8 @@ def _mask(sig, num_args, hide_args, hide_kwargs,
             kwoargs[kwarg_name] = _util.funcsigs.Parameter(
                 kwarg_name, _util.funcsigs.Parameter.KEYWORD_ONLY,
                 default=named_args[kwarg_name])
-            src[kwarg_name] = [partial_obj]
+            if tracking:
+                src[kwarg_name] = _new_source_list((partial_obj,))
         consumed_names.add(kwarg_name)
 
     if hide_kwargs or hide_varkwargs:
@@ -707,17 +1383,16 @@ def _mask(sig, num_args, hide_args, hide_kwargs,
             src.pop(varkwargs.name, None)
         varkwargs = None
 
-    if partial_mode:
+    if partial_mode and tracking:
         src = copy_sources(src, increase=True)
         src['+depths'][partial_obj] = 0
-    ret = apply_params(sig, posargs, pokargs, varargs, kwoargs, varkwargs, src)
-    return ret
+    return SortedParameters(posargs, pokargs, varargs, kwoargs, varkwargs, src)
 
 
 def mask(sig, num_args=0,
          hide_args=False, hide_kwargs=False,
          hide_varargs=False, hide_varkwargs=False,
-         *named_args):
+         *named_args, **kwargs):
     """Removes the given amount of positional parameters and the given named
     parameters from ``sig``.
 
@@ -731,6 +1406,8 @@ def mask(sig, num_args=0,
     :param hide_varkwargs: If true, mask the ``*kwargs``-like parameter
         completely if present.
     :return: a `inspect.Signature` object
+    :param bool sources: Whether to compute the result's ``sources``.
+        Defaults to the setting of `source_tracking`.
     :raises: `ValueError` if the signature cannot handle the arguments
         to be passed.
 
@@ -745,14 +1422,17 @@ def mask(sig, num_args=0,
         (*, c)
 
     """
-    return _mask(sig, num_args, hide_args, hide_kwargs,
-                 hide_varargs, hide_varkwargs, named_args, None)
+    sources = _sources_option(kwargs)
+    with source_tracking.scope(sources):
+        return algebra_cache(_mask, (
+            sig, num_args, hide_args, hide_kwargs,
+            hide_varargs, hide_varkwargs, named_args, None))
 
 
 def forwards(outer, inner, num_args=0,
              hide_args=False, hide_kwargs=False,
              use_varargs=True, use_varkwargs=True,
-             partial=False, *named_args):
+             partial=False, *named_args, **kwargs):
     """Calls `mask` on ``inner``, then returns the result of calling
     `embed` with ``outer`` and the result of `mask`.
 
@@ -761,6 +1441,8 @@ def forwards(outer, inner, num_args=0,
     :param bool partial: Set to `True` if the arguments are passed to
         ``partial(func_with_inner, *args, **kwargs)`` rather than
         ``func_with_inner``.
+    :param bool sources: Whether to compute the result's ``sources``.
+        Defaults to the setting of `source_tracking`.
 
     ``use_varargs`` and ``use_varkwargs`` are the same parameters as in
     `.embed`, and ``num_args``, ``named_args``, ``hide_args`` and
@@ -782,17 +1464,182 @@ def forwards(outer, inner, num_args=0,
         :ref:`forwards-pick`
 
     """
+    sources = _sources_option(kwargs)
+    with source_tracking.scope(sources):
+        return algebra_cache(_forwards, (
+            outer, inner, num_args, hide_args, hide_kwargs,
+            use_varargs, use_varkwargs, partial) + named_args)
+
+
+def _forwards(outer, inner, num_args, hide_args, hide_kwargs,
+              use_varargs, use_varkwargs, partial, *named_args):
+    # same as embed(outer, mask(inner, ...)), but the masked parameters are
+    # passed on in sorted form rather than as an intermediate signature
+    i_sorted = _sorted(inner)
     if partial:
-        params = []
-        for param in inner.parameters.values():
-            if param.kind in [param.VAR_POSITIONAL, param.VAR_KEYWORD]:
-                params.append(param)
-            else:
-                params.append(param.replace(default=None))
-        inner = inner.replace(parameters=params)
-    return embed(
-        use_varargs, use_varkwargs,
-        outer,
-        mask(inner, num_args,
-             hide_args, hide_kwargs, False, False,
-             *named_args))
+        i_sorted = i_sorted._replace(
+            posargs=list(_none_defaults(i_sorted.posargs)),
+            pokargs=list(_none_defaults(i_sorted.pokargs)),
+            kwoargs=_util.OrderedDict(
+                (param.name, param)
+                for param in _none_defaults(i_sorted.kwoargs.values())))
+    masked = _mask_sorted(
+        _Unsorted(inner, i_sorted) if partial else inner, i_sorted,
+        num_args, hide_args, hide_kwargs, False, False, named_args, None)
+    try:
+        ret = _embed(_sorted(outer), masked, use_varargs, use_varkwargs)
+    except ValueError:
+        raise IncompatibleSignatures(
+            apply_params(inner, *masked), (outer,))
+    sources = ret[5] if source_tracking.active else {}
+    return apply_params(outer, *ret[:5], sources=sources)
+
+
+def _none_defaults(params):
+    for param in params:
+        yield param.replace(default=None)
+
+
+class _Unsorted(object):
+    # stands for the signature with the given sorted parameters in error
+    # messages, and only builds it if one is raised
+    __slots__ = ('sig', 'sorted_params')
+
+    def __init__(self, sig, sorted_params):
+        self.sig = sig
+        self.sorted_params = sorted_params
+
+    def __str__(self):
+        return str(apply_params(self.sig, *self.sorted_params[:5]))
+
+
+class AlgebraCache(object):
+    """LRU cache for the results of `merge`, `embed`, `mask` and
+    `forwards`.
+
+    Results are keyed by the `structural_key` of the signatures passed, the
+    other arguments, whether `source_tracking` is active, and the pattern in
+    which callables appear in the signatures' sources. A cached result has
+    its sources remapped onto the callables of the signatures actually
+    passed. Exceptions are not cached.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.enabled = True
+        self.entries = _util.OrderedDict()
+        self.lock = threading.Lock()
+
+    def enable(self):
+        """Starts caching results."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops caching results and drops the existing entries."""
+        self.enabled = False
+        self.clear()
+
+    def clear(self):
+        """Drops every cached result."""
+        with self.lock:
+            self.entries.clear()
+
+    def __call__(self, func, args):
+        if not self.enabled:
+            return func(*args)
+        key, callables = _algebra_key(func, args)
+        try:
+            entry = self._get(key)
+        except TypeError:
+            # unhashable argument or callable
+            return func(*args)
+        if entry is not None:
+            return _remap(entry, callables)
+        ret = func(*args)
+        entry = _algebra_entry(args, ret, callables)
+        if entry is not None:
+            self._put(key, entry)
+        return ret
+
+    def _get(self, key):
+        with self.lock:
+            try:
+                entry = self.entries.pop(key)
+            except KeyError:
+                return None
+            self.entries[key] = entry
+            return entry
+
+    def _put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def _algebra_key(func, args):
+    # callables are numbered in order of appearance
+    index = {}
+    number = index.setdefault
+    key = [func]
+    tracking = source_tracking.active
+    for arg in args:
+        if not isinstance(arg, _util.funcsigs.Signature):
+            key.append(arg)
+            continue
+        key.append(getattr(arg, 'key', None) or structural_key(arg))
+        if not tracking:
+            # the result doesn't depend on the sources
+            continue
+        sources = getattr(arg, 'sources', {})
+        for name, funcs in sorted(sources.items()):
+            if name == '+depths':
+                continue
+            key.append(name)
+            key.append(tuple([number(f, len(index)) for f in funcs]))
+        key.append(tuple([
+            (number(f, len(index)), depth)
+            for f, depth in sources.get('+depths', {}).items()]))
+    key.append(tracking)
+    key = tuple(key)
+    callables = [None] * len(index)
+    for f, i in index.items():
+        callables[i] = f
+    return key, callables
+
+
+def _algebra_entry(args, ret, callables):
+    index = dict((f, i) for i, f in enumerate(callables))
+    sources = getattr(ret, 'sources', {})
+    try:
+        canonical = dict(
+            (name, [index[f] for f in funcs])
+            for name, funcs in sources.items() if name != '+depths')
+        depths = None
+        if '+depths' in sources:
+            depths = [(index[f], depth)
+                      for f, depth in sources['+depths'].items()]
+    except (KeyError, TypeError):
+        return None
+    # structural keys refer to defaults and annotations by id, so they
+    # must be kept alive for as long as the entry is
+    keepalive = [
+        (tuple(arg.parameters.values()), arg.return_annotation)
+        for arg in args if isinstance(arg, _util.funcsigs.Signature)]
+    return (keepalive, tuple(ret.parameters.values()),
+            ret.return_annotation, canonical, depths)
+
+
+def _remap(entry, callables):
+    _, params, return_annotation, canonical, depths = entry
+    sources = dict(
+        (name, _new_source_list([callables[i] for i in funcs]))
+        for name, funcs in canonical.items())
+    if depths is not None:
+        sources['+depths'] = _new_depths(
+            (callables[i], depth) for i, depth in depths)
+    return Signature(params, return_annotation=return_annotation,
+                     sources=sources, __validate_parameters__=False)
+
+
+algebra_cache = AlgebraCache()
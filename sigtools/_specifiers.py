@@ -19,11 +19,405 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import time
+import threading
+import weakref
 
 from sigtools import _signatures, _util
+from sigtools._persist import (
+    signature_manifest, persistent_cache, shared_store)
 
 
-def forged_signature(obj, auto=True, args=(), kwargs={}):
+class SignatureCache(object):
+    """Process-wide cache for the results of `forged_signature`.
+
+    Entries are kept in a table keyed by the examined objects' ids, and
+    each one is dropped when its object is garbage-collected. The examined
+    objects themselves are left untouched. Objects that can't be weakly
+    referenced are never cached. As the sources of a signature usually
+    include the object it was computed for, cached signatures hold that
+    object and the methods bound to it through weak references, so that the
+    cache doesn't keep it alive. The other sources are held as they are, so
+    cached signatures have the same sources as those computed anew for as
+    long as the object lives.
+
+    Lookups passing ``args`` or ``kwargs`` reuse a result computed for other
+    arguments when the values that affected it, see `Sensitivity`, are the
+    same objects. Up to `max_variants` such results are kept per object.
+
+    The cache is disabled by default. Once enabled, repeated lookups return
+    the same `inspect.Signature` object, which must therefore not be
+    modified by the caller.
+    """
+
+    max_variants = 8
+
+    def __init__(self):
+        self.enabled = False
+        self.entries = {}
+
+    def enable(self):
+        """Starts caching signatures."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops caching signatures and drops the existing entries."""
+        self.enabled = False
+        self.clear()
+
+    def clear(self):
+        """Drops every cached signature."""
+        self.entries.clear()
+
+    def invalidate(self, obj):
+        """Drops the signatures cached for ``obj``, if any."""
+        if self._entry(obj) is not None:
+            self.entries.pop(id(obj), None)
+
+    def _entry(self, obj):
+        try:
+            ref, sigs = self.entries[id(obj)]
+        except KeyError:
+            return None
+        if ref() is not obj:
+            return None
+        return sigs
+
+    def _collected(self, ref, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is ref:
+            del self.entries[key]
+
+    def get(self, obj, auto, args=(), kwargs={}, sources=True):
+        """Returns the `Sensitivity.record` of a signature usable for the
+        given arguments, or `None`. Signatures computed with and without
+        ``sources`` are cached separately."""
+        sigs = self._entry(obj)
+        if sigs is None:
+            return None
+        return _find_record(sigs.get((auto, sources), ()), args, kwargs)
+
+    def put(self, obj, auto, record, sources=True):
+        """Stores ``record`` for ``obj`` and returns the record that later
+        lookups will find."""
+        sigs = self._entry(obj)
+        if sigs is None:
+            key = id(obj)
+            try:
+                ref = weakref.ref(
+                    obj, lambda ref: self._collected(ref, key))
+            except TypeError:
+                return record
+            sigs = {}
+            self.entries[key] = ref, sigs
+        sig = record[-1]
+        sig_sources = getattr(sig, 'sources', None)
+        if sig_sources:
+            def weak(func):
+                return func is obj or getattr(func, '__self__', None) is obj
+            record = record[:-1] + (sig.replace(
+                sources=_signatures.weak_sources(sig_sources, weak)),)
+        records = sigs.setdefault((auto, sources), [])
+        records.append(record)
+        del records[:-self.max_variants]
+        return record
+
+
+signature_cache = SignatureCache()
+
+
+signature_stores = [signature_manifest, persistent_cache, shared_store]
+"""Stores consulted, once enabled, for signatures computed without
+``args`` or ``kwargs`` before computing them."""
+
+
+_clock = getattr(time, 'monotonic', time.time)
+_absent = object()
+
+
+class Budget(object):
+    """Limits how much work automatic signature discovery may do for a
+    single call to `forged_signature`.
+
+    :param int max_depth: How many levels of forwarding are followed.
+    :param int max_functions: How many callables are examined for
+        forwarding.
+    :param float max_time: After how many seconds no more callables are
+        examined.
+
+    Limits left to `None` don't apply. Callables reached once the budget
+    has run out get their signature without automatic discovery, so the
+    result is the best one computed until then. Such results are not stored
+    in `signature_cache`.
+
+    The same budget can be passed to any number of calls. ``exhaustions``
+    counts those that ran out of it.
+    """
+
+    def __init__(self, max_depth=None, max_functions=None, max_time=None):
+        self.max_depth = max_depth
+        self.max_functions = max_functions
+        self.max_time = max_time
+        self.exhaustions = 0
+
+    def __repr__(self):
+        return '<Budget max_depth={0!r} max_functions={1!r} max_time={2!r}>'\
+            .format(self.max_depth, self.max_functions, self.max_time)
+
+
+class Sensitivity(object):
+    """Tracks which of the arguments passed to `forged_signature` affected
+    the signature it computed.
+
+    Automatic signature discovery calls `use` with the value of each
+    parameter it looks at. Its result can then be reused for arguments that
+    have the same number of positional arguments, the same keyword argument
+    names and the same objects in the slots where used values were found.
+    It is reused for any arguments if none were looked at.
+    """
+
+    def __init__(self, args, kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.consulted = False
+        self.slots = set()
+
+    def use(self, value=_absent):
+        """Notes that ``value`` affected the result. Without ``value``,
+        notes that the absence of a parameter did."""
+        self.consulted = True
+        if value is not _absent and not self._locate(value):
+            if isinstance(value, tuple):
+                values = value
+            elif isinstance(value, dict):
+                values = value.values()
+            else:
+                values = ()
+            for item in values:
+                self._locate(item)
+
+    def _locate(self, value):
+        found = False
+        for i, arg in enumerate(self.args):
+            if arg is value:
+                self.slots.add(i)
+                found = True
+        for name, arg in self.kwargs.items():
+            if arg is value:
+                self.slots.add(name)
+                found = True
+        return found
+
+    def record(self, sig):
+        """Returns the cache record for ``sig``: a tuple of the arguments'
+        shape (`None` if any arguments do), the relevant slots, the values
+        in them and ``sig`` itself."""
+        if not self.consulted:
+            return None, (), (), sig
+        slots = tuple(sorted(self.slots, key=repr))
+        # the values are kept alive so that their ids stay unique
+        return (
+            _shape(self.args, self.kwargs), slots,
+            tuple(_slot(self.args, self.kwargs, slot) for slot in slots),
+            sig)
+
+
+def _shape(args, kwargs):
+    return len(args), tuple(sorted(kwargs))
+
+
+def _slot(args, kwargs, slot):
+    if isinstance(slot, int):
+        return args[slot]
+    return kwargs[slot]
+
+
+def _find_record(records, args, kwargs):
+    shape = None
+    for record in records:
+        record_shape, slots, values, sig = record
+        if record_shape is None:
+            return record
+        if shape is None:
+            shape = _shape(args, kwargs)
+        if record_shape == shape and all(
+                _value_key(_slot(args, kwargs, slot)) == _value_key(value)
+                for slot, value in zip(slots, values)):
+            return record
+    return None
+
+
+def _identity(obj):
+    # bound methods are created anew on each attribute access
+    func = getattr(obj, '__func__', None)
+    instance = getattr(obj, '__self__', None)
+    if func is None or instance is None:
+        return id(obj)
+    return id(func), id(instance)
+
+
+def _value_key(value):
+    if isinstance(value, _autoforwards.Unknown):
+        return None
+    return id(value)
+
+
+class Resolution(object):
+    """Memo shared by the nested signature lookups made through
+    `forwarded_signature` while `forged_signature` computes one signature.
+
+    Each callable is resolved once per set of arguments that matter to it,
+    see `Sensitivity`, no matter how many paths lead to it. Reaching a
+    callable again while it is still being resolved means its forwarding is
+    circular, which is reported as
+    `UnknownForwards <sigtools._autoforwards.UnknownForwards>`.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, budget=None):
+        self.memo = {}
+        self.pending = set()
+        self.sensitivities = []
+        self.parent = None
+        self.origin = None
+        self.budget = budget
+        self.depth = 0
+        self.functions = 0
+        self.exhausted = False
+        self.deadline = None
+        if budget is not None and budget.max_time is not None:
+            self.deadline = _clock() + budget.max_time
+
+    @classmethod
+    def current(cls):
+        """Returns the innermost resolution in progress in this thread."""
+        return getattr(cls._local, 'resolution', None)
+
+    @classmethod
+    def current_sensitivity(cls):
+        """Returns the `Sensitivity` of the signature being computed in this
+        thread, if any."""
+        resolution = cls.current()
+        if resolution is None or not resolution.sensitivities:
+            return None
+        return resolution.sensitivities[-1]
+
+    def fork(self):
+        """Returns a resolution that shares this one's memo and budget, for
+        computing anew the signature of a callable being resolved."""
+        ret = Resolution()
+        ret.memo = self.memo
+        ret.origin = self
+        ret.budget = self.budget
+        ret.depth = self.depth
+        ret.functions = self.functions
+        ret.exhausted = self.exhausted
+        ret.deadline = self.deadline
+        return ret
+
+    def __enter__(self):
+        self.parent = self.current()
+        self._local.resolution = self
+        return self
+
+    def __exit__(self, *exc):
+        self._local.resolution = self.parent
+        self.parent = None
+        origin = self.origin
+        if origin is not None:
+            origin.functions = self.functions
+            origin.exhausted = self.exhausted
+
+    def within_budget(self):
+        """Accounts for examining one more callable. Returns `False` once
+        the budget has run out."""
+        budget = self.budget
+        if budget is None:
+            return True
+        if not self.exhausted:
+            self.exhausted = (
+                (budget.max_depth is not None
+                    and self.depth > budget.max_depth)
+                or (budget.max_functions is not None
+                    and self.functions >= budget.max_functions)
+                or (self.deadline is not None and _clock() >= self.deadline)
+                )
+            if self.exhausted:
+                budget.exhaustions += 1
+        if self.exhausted:
+            return False
+        self.functions += 1
+        return True
+
+    def forge(self, obj, auto, args, kwargs):
+        # signatures computed without sources are not stored persistently,
+        # as they would be found by lookups that need them, and are cached
+        # apart from those with sources
+        tracking = _signatures.source_tracking.active
+        if signature_cache.enabled:
+            record = signature_cache.get(
+                obj, auto, args, kwargs, sources=tracking)
+            if record is not None:
+                return record
+        stores = []
+        if not args and not kwargs:
+            stores = [store for store in signature_stores if store.enabled]
+        for store in stores:
+            sig = store.get(obj, auto)
+            if sig is not None:
+                record = _shape(args, kwargs), (), (), sig
+                break
+        else:
+            sensitivity = Sensitivity(args, kwargs)
+            self.sensitivities.append(sensitivity)
+            try:
+                sig = _forged_signature(obj, auto, args, kwargs)
+            finally:
+                self.sensitivities.pop()
+            record = sensitivity.record(sig)
+            if tracking and not self.exhausted:
+                for store in stores:
+                    store.put(obj, auto, sig)
+        if signature_cache.enabled and not self.exhausted:
+            record = signature_cache.put(
+                obj, auto, record, sources=tracking)
+        return record
+
+    def resolve(self, obj, auto, args, kwargs):
+        """Returns the `Sensitivity.record` of ``obj``'s signature."""
+        # nested lookups may compute the signature with or without sources
+        key = _identity(obj), auto, _signatures.source_tracking.active
+        try:
+            _, records = self.memo[key]
+        except KeyError:
+            # the examined objects are kept alive so that their ids stay
+            # unique
+            records = self.memo[key] = obj, []
+            records = records[1]
+        record = _find_record(records, args, kwargs)
+        if record is not None:
+            return record
+        # forwarding back to a callable being resolved is circular no
+        # matter the arguments, which may grow on each pass
+        key = _identity(obj), auto
+        if key in self.pending:
+            raise _autoforwards.UnknownForwards(
+                'Circular forwarding of *args, **kwargs')
+        self.pending.add(key)
+        self.depth += 1
+        try:
+            record = self.forge(
+                obj, auto and self.within_budget(), args, kwargs)
+        finally:
+            self.depth -= 1
+            self.pending.discard(key)
+        records.append(record)
+        return record
+
+
+def forged_signature(obj, auto=True, args=(), kwargs={}, budget=None,
+                     sources=None):
     """Retrieves the full signature of ``obj``, either by taking note of
     decorators from this module, or by performing automatic signature
     discovery.
@@ -82,10 +476,53 @@ def forged_signature(obj, auto=True, args=(), kwargs={}):
     :param bool auto: Enable automatic signature discovery.
     :param sequence args: Positional arguments passed to the function.
     :param mapping: Named arguments passed to the function.
+    :param Budget budget: Limits the work done by automatic signature
+        discovery.
+    :param bool sources: Whether to compute the signature's ``sources``.
+        Defaults to the setting of
+        `source_tracking <sigtools.signatures.source_tracking>`.
+
+    Results are looked up in `signature_manifest` and memoized by
+    `signature_cache`, `persistent_cache` and `shared_store` once they have
+    been enabled.
+    Within one call, each callable that ``*args`` and ``**kwargs`` are
+    forwarded to is resolved only once, see `Resolution`. Calls made while
+    computing another signature, for instance by forgers, take part in its
+    resolution and use its budget.
 
     """
+    with _signatures.source_tracking.scope(sources):
+        resolution = Resolution.current()
+        if resolution is None or budget not in (None, resolution.budget):
+            resolution = Resolution(budget)
+        elif (_identity(obj), auto) in resolution.pending:
+            # the callable asks for its own signature, for instance through
+            # as_forged, while it is being resolved
+            resolution = resolution.fork()
+        else:
+            # lookups made by forgers take part in the resolution in
+            # progress, its memo, cycle detection and budget
+            return resolution.resolve(obj, auto, args, kwargs)[-1]
+        with resolution:
+            return resolution.resolve(obj, auto, args, kwargs)[-1]
+
+
+def forwarded_signature(obj, args, kwargs):
+    """Like `forged_signature`, for a callable that ``*args`` and
+    ``**kwargs`` are forwarded to, as part of the resolution in progress.
+
+    Returns the signature and whether it depends on ``args`` or
+    ``kwargs``."""
+    resolution = Resolution.current()
+    if resolution is None:
+        return forged_signature(obj, args=args, kwargs=kwargs), True
+    shape, _, _, sig = resolution.resolve(obj, True, args, kwargs)
+    return sig, shape is not None
+
+
+def _forged_signature(obj, auto, args, kwargs):
     subject = _util.get_introspectable(obj, af_hint=auto)
-    forger = getattr(subject, '_sigtools__forger', None)
+    forger = _util.get_forger(subject)
     if forger is not None:
         ret = forger(obj=subject)
         if ret is not None:
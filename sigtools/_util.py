@@ -21,6 +21,8 @@
 
 import inspect
 import ast
+import types
+import linecache
 from functools import update_wrapper, partial
 from weakref import WeakKeyDictionary
 
@@ -108,56 +110,274 @@ def safe_get(obj, instance, owner):
     return get(obj, instance, owner)
 
 
-def iter_call(obj):
-    while True:
-        yield obj
+_probes = '__signature__', '_sigtools__forger', '_sigtools__autoforwards_hint'
+_lookup_hooks = '__getattribute__', '__getattr__', '__class__'
+# partial sets the generic attribute lookup explicitly
+_generic_lookup = vars(partial).get('__getattribute__')
+_slot_wrapper = type(object.__init__)
+_type_forgers = {}
+_dispatch_cache = WeakKeyDictionary()
+
+
+class _Dispatch(object):
+    """Records what `get_introspectable` finds when probing instances of
+    one type without looking at the instances themselves.
+
+    If the type doesn't customize attribute lookup, an attribute that is
+    absent from every class in its MRO can only come from the instance's
+    ``__dict__``, which is checked directly instead of raising and catching
+    `AttributeError`. Attributes found on the type are probed as usual.
+    """
+
+    __slots__ = ('generic', 'on_type', 'call_ends', 'partial', 'forger')
+
+    def __init__(self, cls):
+        mro = getattr(cls, '__mro__', None) or (cls,)
+        dicts = [vars(c) for c in mro]
+        self.generic = not any(
+            name in d and d[name] is not _generic_lookup
+            for c, d in zip(mro, dicts) if c is not object
+            for name in _lookup_hooks)
+        self.on_type = frozenset(
+            name for name in _probes + ('__call__',)
+            if any(name in d for d in dicts))
+        call = next((d['__call__'] for d in dicts if '__call__' in d), None)
+        # the __call__ of builtin types has no __code__ to follow
+        self.call_ends = self.generic and (
+            call is None or isinstance(call, _slot_wrapper))
+        self.partial = issubclass(cls, partial_)
+        self.forger = next(
+            (_type_forgers[c] for c in mro if c in _type_forgers), None)
+
+    def has(self, obj, name):
+        if self.generic and name not in self.on_type:
+            return _in_dict(obj, name)
         try:
-            obj = obj.__call__
-            obj.__code__.co_filename
-            # raises if this is the __call__ method of a builtin object
+            getattr(obj, name)
         except AttributeError:
-            return
+            return False
+        return True
 
 
-partial_ = partial
+class _MethodDispatch(_Dispatch):
+    """Bound methods look up attributes their type doesn't have on their
+    function instead."""
+
+    __slots__ = ()
+
+    def __init__(self, cls):
+        super(_MethodDispatch, self).__init__(cls)
+        self.call_ends = True
+
+    def has(self, obj, name):
+        if name in self.on_type:
+            return super(_MethodDispatch, self).has(obj, name)
+        func = obj.__func__
+        return _dispatch(func).has(func, name)
+
+
+def _dispatch(obj):
+    cls = type(obj)
+    try:
+        return _dispatch_cache[cls]
+    except KeyError:
+        pass
+    except TypeError:
+        return _Dispatch(cls)
+    factory = _MethodDispatch if cls is types.MethodType else _Dispatch
+    ret = _dispatch_cache[cls] = factory(cls)
+    return ret
+
+
+def clear_dispatch():
+    """Forgets what was recorded about each type, for when attributes that
+    `get_introspectable` looks for are added to existing classes."""
+    _dispatch_cache.clear()
+
+
+def register_forger(cls, forger):
+    """Sets ``forger`` as the signature forger of all instances of ``cls``
+    and its subclasses, or removes it if ``forger`` is `None`."""
+    if forger is None:
+        _type_forgers.pop(cls, None)
+    else:
+        _type_forgers[cls] = forger
+    clear_dispatch()
+
+
+def get_forger(obj):
+    """Returns the signature forger set on ``obj`` or registered for its
+    type, or `None`."""
+    forger = getattr(obj, '_sigtools__forger', None)
+    if forger is None:
+        forger = _dispatch(obj).forger
+    return forger
+
+
+def _in_dict(obj, name):
+    try:
+        return name in obj.__dict__
+    except AttributeError:
+        return False
+
+
+def _next_call(obj, dispatch):
+    if dispatch.call_ends and not _in_dict(obj, '__call__'):
+        return None
+    try:
+        obj = obj.__call__
+        obj.__code__.co_filename
+        # raises if this is the __call__ method of a builtin object
+    except AttributeError:
+        return None
+    return obj
+
+
+def iter_call(obj):
+    while obj is not None:
+        yield obj
+        obj = _next_call(obj, _dispatch(obj))
 
 
 partial_ = partial
 
 
 def get_introspectable(obj, forged=True, af_hint=True, partial=True):
-    for obj in iter_call(obj):
-        try:
-            obj.__signature__
+    while True:
+        dispatch = _dispatch(obj)
+        if dispatch.has(obj, '__signature__'):
             return obj
-        except AttributeError:
-            pass
-        if forged:
-            try:
-                obj._sigtools__forger
-                return obj
-            except AttributeError:
-                pass
-        if af_hint:
-            try:
-                obj._sigtools__autoforwards_hint
-                return obj
-            except AttributeError:
-                pass
-        if partial:
-            if isinstance(obj, partial_):
-                return obj
-    return obj
+        if forged and (dispatch.forger is not None
+                       or dispatch.has(obj, '_sigtools__forger')):
+            return obj
+        if af_hint and dispatch.has(obj, '_sigtools__autoforwards_hint'):
+            return obj
+        if partial and (dispatch.partial if dispatch.generic
+                        else isinstance(obj, partial_)):
+            return obj
+        call = _next_call(obj, dispatch)
+        if call is None:
+            return obj
+        obj = call
+
+
+_ast_cache = WeakKeyDictionary()
+_source_indexes = OrderedDict()
+_source_indexes_maxsize = 64
+
+try:
+    _function_nodes = ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda
+except AttributeError: # pragma: no cover
+    _function_nodes = ast.FunctionDef, ast.Lambda
+
 
 def get_ast(func):
+    """Returns the AST of ``func``'s definition, or `None` if its source
+    can't be found.
+
+    Definitions are looked up in an index built by parsing each source file
+    once. Results are cached per code object for as long as `linecache`
+    holds the same lines for the file it was defined in.
+    """
     try:
         code = func.__code__
     except AttributeError:
         return None
+    filename = code.co_filename
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename, getattr(func, '__globals__', None))
+    try:
+        cached_lines, node = _ast_cache[code]
+    except KeyError:
+        pass
+    else:
+        if lines and cached_lines is lines:
+            return node
+    node = None
+    if lines:
+        index = get_source_index(filename, lines)
+        if index is not None:
+            node = find_definition(index, code, code.co_firstlineno)
+    if node is None:
+        node = _parse_code(code)
+    if node is not None and lines:
+        _ast_cache[code] = lines, node
+    return node
+
+
+def get_source_index(filename, lines):
+    """Returns a mapping of line numbers to the function and lambda nodes
+    that start on them, for the given lines of ``filename``.
+
+    The indexes of the most recently used files are kept for as long as
+    `linecache` holds the same lines for them.
+    """
+    try:
+        indexed_lines, index = _source_indexes.pop(filename)
+    except KeyError:
+        pass
+    else:
+        if indexed_lines is lines:
+            _source_indexes[filename] = indexed_lines, index
+            return index
+    try:
+        module = ast.parse(''.join(lines))
+    except (SyntaxError, ValueError):
+        index = None
+    else:
+        index = index_definitions(module)
+    _source_indexes[filename] = lines, index
+    while len(_source_indexes) > _source_indexes_maxsize:
+        _source_indexes.popitem(last=False)
+    return index
+
+
+def index_definitions(tree):
+    index = {}
+    for node in ast.walk(tree):
+        if isinstance(node, _function_nodes):
+            # co_firstlineno is the line of the first decorator
+            lineno = node.lineno
+            for decorator in getattr(node, 'decorator_list', ()):
+                lineno = min(lineno, decorator.lineno)
+            index.setdefault(lineno, []).append(node)
+    return index
+
+
+def _node_name(node):
+    return getattr(node, 'name', '<lambda>')
+
+
+def _node_params(node):
+    args = node.args
+    params = [getattr(arg, 'arg', getattr(arg, 'id', None))
+              for arg in getattr(args, 'posonlyargs', []) + args.args]
+    params.extend(arg.arg for arg in getattr(args, 'kwonlyargs', ()))
+    return params
+
+
+def find_definition(index, code, lineno):
+    candidates = [
+        node for node in index.get(lineno, ())
+        if _node_name(node) == code.co_name]
+    if len(candidates) > 1:
+        nparams = code.co_argcount + getattr(code, 'co_kwonlyargcount', 0)
+        params = list(code.co_varnames[:nparams])
+        candidates = [
+            node for node in candidates if _node_params(node) == params]
+    if len(candidates) == 1:
+        return candidates[0]
+    return None
+
+
+def _parse_code(code):
     try:
         rawsource = inspect.getsource(code)
     except (OSError, IOError):
         return None
     source = inspect.cleandoc('\n' + rawsource)
     module = ast.parse(source)
-    return module.body[0]
+    node = find_definition(index_definitions(module), code, 1)
+    if node is None and isinstance(module.body[0], _function_nodes):
+        return module.body[0]
+    return node
@@ -0,0 +1,156 @@
+# sigtools - Collection of Python modules for manipulating function signatures
+# Copyright (c) 2013-2015 Yann Kaiser
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Generates a manifest of the signatures of every public callable in one
+or more packages, so that they don't need to be discovered from source at
+run time::
+
+    $ python -m sigtools.manifest -o signatures.json mypackage
+
+The modules of each package are examined in parallel. Entries are keyed by
+qualified name and code hash, see `sigtools.specifiers.signature_manifest`
+for how to use the manifest.
+"""
+
+import sys
+import types
+import pkgutil
+import argparse
+import importlib
+import multiprocessing
+
+from sigtools import specifiers, _persist
+
+
+def iter_modules(name):
+    """Yields the name of package ``name`` followed by those of all its
+    submodules."""
+    package = importlib.import_module(name)
+    yield name
+    path = getattr(package, '__path__', None)
+    if path is None:
+        return
+    for _, modname, _ in pkgutil.walk_packages(
+            path, name + '.', onerror=lambda name: None):
+        yield modname
+
+
+def _methods(cls):
+    for name, value in sorted(vars(cls).items()):
+        if name.startswith('_') and name != '__init__':
+            continue
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, types.FunctionType):
+            yield value
+
+
+def public_callables(module):
+    """Yields the public functions defined in ``module``, including the
+    methods of its public classes."""
+    names = getattr(module, '__all__', None)
+    if names is None:
+        names = sorted(name for name in vars(module)
+                       if not name.startswith('_'))
+    for name in names:
+        obj = getattr(module, name, None)
+        if getattr(obj, '__module__', None) != module.__name__:
+            continue
+        if isinstance(obj, type):
+            for method in _methods(obj):
+                yield method
+        elif callable(obj):
+            yield obj
+
+
+def module_entries(name):
+    """Returns the manifest entries for the public callables of module
+    ``name``."""
+    module = importlib.import_module(name)
+    entries = {}
+    for obj in public_callables(module):
+        key = _persist.manifest_key(obj, True)
+        if key is None:
+            continue
+        try:
+            entries[key] = _persist.dump_signature(
+                specifiers.signature(obj), obj)
+        except (TypeError, ValueError):
+            continue
+    return entries
+
+
+def _module_entries(name):
+    try:
+        return name, module_entries(name), None
+    except Exception as exc:
+        return name, {}, '{0}: {1}'.format(type(exc).__name__, exc)
+
+
+def generate(packages, jobs=None):
+    """Examines every module of ``packages`` using up to ``jobs``
+    processes. Returns the manifest entries along with a list of
+    ``(module name, error)`` pairs for the modules that couldn't be
+    examined."""
+    names = []
+    for package in packages:
+        for name in iter_modules(package):
+            if name not in names:
+                names.append(name)
+    if jobs == 1:
+        results = [_module_entries(name) for name in names]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(_module_entries, names)
+        finally:
+            pool.close()
+            pool.join()
+    entries = {}
+    errors = []
+    for name, module_entries, error in results:
+        entries.update(module_entries)
+        if error is not None:
+            errors.append((name, error))
+    return entries, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sigtools.manifest',
+        description='Writes the signatures of the public callables of '
+                    'packages to a manifest.')
+    parser.add_argument('packages', nargs='+', metavar='package')
+    parser.add_argument('-o', '--output', required=True,
+                        help='path of the manifest to write')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes to use, '
+                             'defaults to the number of CPUs')
+    args = parser.parse_args(argv)
+    entries, errors = generate(args.packages, args.jobs)
+    for name, error in errors:
+        sys.stderr.write('skipped {0}: {1}\n'.format(name, error))
+    _persist._write_entries(args.output, entries)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -33,15 +33,15 @@ individually. They are most notably used by the decorators from
 from sigtools import modifiers
 from sigtools._signatures import (
     signature,
-    IncompatibleSignatures,
+    IncompatibleSignatures, FrozenSignature, structural_key,
     sort_params, apply_params,
-    merge, embed, mask, forwards
+    merge, embed, mask, forwards, algebra_cache, source_tracking
     )
 
 __all__ = [
-    'signature',
+    'signature', 'FrozenSignature', 'structural_key',
     'merge', 'embed', 'mask', 'forwards', 'IncompatibleSignatures',
-    'sort_params', 'apply_params',
+    'sort_params', 'apply_params', 'algebra_cache', 'source_tracking',
     ]
 
 
@@ -46,7 +46,10 @@ __all__ = [
     'forwards_to_function', 'forwards_to_method',
     'forwards_to_super', 'apply_forwards_to_super',
     'forwards',
-    'forger_function', 'set_signature_forger', 'as_forged'
+    'forger_function', 'set_signature_forger', 'register_signature_forger',
+    'as_forged',
+    'signature_cache', 'signature_manifest', 'persistent_cache',
+    'shared_store', 'Budget',
     ]
 
 
@@ -56,6 +59,63 @@ _kwowr = modifiers.kwoargs('obj')
 signature = _specifiers.forged_signature
 
 
+signature_cache = _specifiers.signature_cache
+"""Weakly-keyed cache of the signatures computed by `signature`. It is
+disabled until its ``enable`` method is called::
+
+    >>> from sigtools import specifiers
+    >>> specifiers.signature_cache.enable()
+    >>> def func(a, b):
+    ...     pass
+    ...
+    >>> specifiers.signature(func) is specifiers.signature(func)
+    True
+    >>> specifiers.signature_cache.invalidate(func)
+    >>> specifiers.signature_cache.clear()
+"""
+
+
+signature_manifest = _specifiers.signature_manifest
+"""Signatures generated ahead of time by ``python -m sigtools.manifest``,
+which `signature` looks up before examining the source of a function. It is
+disabled until its ``load`` method is called with the path of the
+manifest::
+
+    >>> from sigtools import specifiers
+    >>> specifiers.signature_manifest.load('signatures.json') # doctest: +SKIP
+
+Functions whose code changed since the manifest was generated are examined
+as usual.
+"""
+
+
+persistent_cache = _specifiers.persistent_cache
+"""Cache of the signatures computed by `signature` that is kept in a file
+across processes. It is disabled until its ``enable`` method is called with
+the path of the file to use::
+
+    >>> from sigtools import specifiers
+    >>> specifiers.persistent_cache.enable('signatures.json') # doctest: +SKIP
+
+Entries are only used while the code of every function they were computed
+from is unchanged.
+"""
+
+
+shared_store = _specifiers.shared_store
+"""Store of the signatures computed by `signature` that is shared between
+processes through a memory-mapped file. It is disabled until its ``attach``
+method is called with the path of the file to use, for instance in a
+prefork server before or after forking its workers::
+
+    >>> from sigtools import specifiers
+    >>> specifiers.shared_store.attach('/tmp/signatures.shm') # doctest: +SKIP
+"""
+
+
+Budget = _specifiers.Budget
+
+
 class _AsForged(object):
     def __init__(self):
         self.currently_computing = set()
@@ -110,6 +170,8 @@ def set_signature_forger(obj, forger, emulate=None):
     if not emulate:
         try:
             obj._sigtools__forger = forger
+            if isinstance(obj, type):
+                _util.clear_dispatch()
             return obj
         except (AttributeError, TypeError):
             if emulate is False:
@@ -120,6 +182,35 @@ def set_signature_forger(obj, forger, emulate=None):
         return emulate(obj, forger)
 
 
+def register_signature_forger(cls, forger):
+    """Sets the signature forger of every instance of ``cls`` and its
+    subclasses, for callable types that can't have their instances
+    decorated.
+
+    :param callable forger: Called with the instance as the named argument
+        ``obj``. It returns its signature, or `None` to let the signature
+        be determined as if no forger was registered. If `None` is passed
+        instead of a callable, the registration for ``cls`` is removed.
+
+    A forger set on an instance with `set_signature_forger` takes precedence
+    over the one registered for its type::
+
+        >>> from sigtools import specifiers, support
+        >>> class Command(object):
+        ...     def __init__(self, params):
+        ...         self.params = params
+        ...     def __call__(self, *args, **kwargs):
+        ...         pass
+        ...
+        >>> specifiers.register_signature_forger(
+        ...     Command, lambda obj: support.s(obj.params))
+        >>> print(specifiers.signature(Command('a, *, b')))
+        (a, *, b)
+
+    """
+    _util.register_forger(cls, forger)
+
+
 def _transform(obj, meta):
     try:
         name = obj.__name__
@@ -0,0 +1,22 @@
+def inner(a, b=1, *args, **kwargs):
+    raise NotImplementedError
+
+
+def outer(x, *args, **kwargs):
+    return inner(*args, **kwargs)
+
+
+def _private(*args, **kwargs):
+    return inner(*args, **kwargs)
+
+
+class AClass(object):
+    def __init__(self, *args, **kwargs):
+        self.obj = outer(*args, **kwargs)
+
+    @staticmethod
+    def method(y, *args, **kwargs):
+        return outer(*args, **kwargs)
+
+    def _private(self):
+        raise NotImplementedError
@@ -1,9 +1,15 @@
+import os
+import ast
 import sys
+import shutil
+import tempfile
+import weakref
 from functools import partial, wraps
 from mock import patch
 
 from sigtools import support, modifiers, specifiers, signatures, _util
-from sigtools.tests.util import Fixtures, tup
+from sigtools import _autoforwards, _bytecode, _specifiers
+from sigtools.tests.util import Fixtures, SignatureTests, tup
 
 
 if sys.version_info >= (3,):
@@ -222,6 +228,14 @@ class AutoforwardsTests(Fixtures):
         support.test_func_sig_coherent(
             func, check_return=False, check_invalid=False)
 
+    lambda_ = (
+        lambda a, *args, **kwargs: _wrapped(*args, **kwargs),
+        'a, x, y, *, z', {0: 'a', '_wrapped': 'xyz'})
+
+    same_line_lambdas = (
+        [lambda *b: b, lambda c, *k, **w: _wrapped(c, *k, **w)][1],
+        'c, y, *, z', {0: 'c', '_wrapped': 'yz'})
+
     @tup('a, b, *args, z',
          {'unknown_args': ['a', 'b', 'args'], '_wrapped': 'z'})
     def unknown_args(a, b, *args, **kwargs):
@@ -292,3 +306,329 @@ class UnresolvableAutoforwardsTests(Fixtures):
             obj(*p, **k)
         with patch.multiple(_util.funcsigs, signature=sig_replace):
             self.assertSigsEqual(specifiers.signature(func), sig)
+
+
+class KnownFailuresTests(Fixtures):
+    def _test(self, func, reason):
+        known_failures = _autoforwards.known_failures
+        known_failures.pop(func.__code__, None)
+        self.assertSigsEqual(
+            specifiers.signature(func), signatures.signature(func))
+        self.assertEqual(known_failures.get(func.__code__), reason)
+        if reason is not None:
+            with patch.object(_util, 'get_ast') as get_ast:
+                self.assertSigsEqual(
+                    specifiers.signature(func), signatures.signature(func))
+            self.assertFalse(get_ast.called)
+
+    @tup('No *args or **kwargs parameter')
+    def no_stars(a, b):
+        return _wrapped(a, b)
+
+    @tup('No forwarding of *args, **kwargs found')
+    def no_forwarding(a, *args, **kwargs):
+        return _wrapped(a, args, kwargs)
+
+    no_source = (
+        support.f('a, *args, **kwargs'),
+        'No forwarding of *args, **kwargs found')
+
+    @tup(None)
+    def unresolvable(a, *args, **kwargs):
+        return doesntexist(*args, **kwargs) # pyflakes: silence
+
+
+def _make_closure(wrapped):
+    def func(*args, **kwargs):
+        return wrapped(*args, **kwargs)
+    return func
+
+
+class GetAstTests(SignatureTests):
+    def test_cached(self):
+        f1 = _make_closure(_wrapped)
+        f2 = _make_closure(func)
+        node = _util.get_ast(f1)
+        self.assertTrue(node is not None)
+        self.assertIs(_util.get_ast(f1), node)
+        self.assertIs(_util.get_ast(f2), node)
+
+    def test_file_changed(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'mod.py')
+        def write(source, mtime):
+            with open(filename, 'w') as f:
+                f.write(source)
+            os.utime(filename, (mtime, mtime))
+        write('def func(*args, **kwargs):\n    a(*args, **kwargs)\n', 1000)
+        ns = {}
+        with open(filename) as f:
+            exec(compile(f.read(), filename, 'exec'), ns)
+        func = ns['func']
+        node = _util.get_ast(func)
+        self.assertEqual(node.body[0].value.func.id, 'a')
+        self.assertIs(_util.get_ast(func), node)
+        write('def func(*args, **kwargs):\n    bb(*args, **kwargs)\n', 2000)
+        node = _util.get_ast(func)
+        self.assertEqual(node.body[0].value.func.id, 'bb')
+
+    def test_file_parsed_once(self):
+        _util.get_source_index(__file__, [])
+        _util._ast_cache.clear()
+        with patch.object(_util.ast, 'parse', wraps=ast.parse) as parse:
+            for f in (AutoforwardsTests.lambda_[0], _make_closure, func):
+                self.assertTrue(_util.get_ast(f) is not None)
+        self.assertEqual(parse.call_count, 1)
+
+    def test_source_indexes_bounded(self):
+        with patch.object(_util, '_source_indexes_maxsize', 3):
+            for i in range(5):
+                _util.get_source_index(
+                    '<index {0}>'.format(i), ['def f(): pass\n'])
+            self.assertEqual(
+                list(_util._source_indexes)[-3:],
+                ['<index 2>', '<index 3>', '<index 4>'])
+            self.assertEqual(len(_util._source_indexes), 3)
+
+    def test_decorated(self):
+        node = _util.get_ast(AutoforwardsTests.kwo[0].func)
+        self.assertEqual(node.name, 'kwo')
+
+
+class CallTemplatesTests(SignatureTests):
+    def test_shared_by_closures(self):
+        f1 = _make_closure(_wrapped)
+        f2 = _make_closure(support.f('a, *, b'))
+        self.assertSigsEqual(specifiers.signature(f1), support.s('x, y, *, z'))
+        with patch.object(_autoforwards, 'CallListerVisitor') as visitor:
+            self.assertSigsEqual(specifiers.signature(f2),
+                                 support.s('a, *, b'))
+        self.assertFalse(visitor.called)
+        self.assertIs(
+            _autoforwards.function_call_templates(f1),
+            _autoforwards.function_call_templates(f2))
+
+    def test_compact(self):
+        def func(a, *args, **kwargs):
+            print(a)
+            a.b(a + 1, *args, **kwargs)
+        call, = _autoforwards.function_call_templates(func)
+        self.assertEqual(call.args, (_autoforwards._unknown,))
+        self.assertIsInstance(call.wrapped, _autoforwards.Attribute)
+        self.assertIsInstance(call.wrapped.value, _autoforwards.Arg)
+
+
+def _cycle_a(*args, **kwargs):
+    return _cycle_b(*args, **kwargs)
+
+
+def _cycle_b(a, *args, **kwargs):
+    return _cycle_a(*args, **kwargs)
+
+
+def _grow_a(*args, **kwargs):
+    return _grow_b(1, *args, **kwargs)
+
+
+def _grow_b(*args, **kwargs):
+    return _grow_a(*args, **kwargs)
+
+
+def _forger_chain_end(d, e):
+    pass
+
+
+def _forger_chain_inner(c, *args, **kwargs):
+    return _forger_chain_end(*args, **kwargs)
+
+
+@specifiers.forwards_to_function(_forger_chain_inner)
+def _forger_chain_forged(b, *args, **kwargs):
+    return _forger_chain_inner(*args, **kwargs)
+
+
+def _forger_chain(a, *args, **kwargs):
+    return _forger_chain_forged(*args, **kwargs)
+
+
+def _diamond_core(x, y):
+    pass
+
+
+def _diamond_left(*args, **kwargs):
+    return _diamond_core(*args, **kwargs)
+
+
+def _diamond_right(*args, **kwargs):
+    return _diamond_core(*args, **kwargs)
+
+
+def _diamond(*args, **kwargs):
+    _diamond_left(*args, **kwargs)
+    return _diamond_right(*args, **kwargs)
+
+
+class _Mutual(object):
+    def f(self, *args, **kwargs):
+        return self.g(*args, **kwargs)
+
+    def g(self, *args, **kwargs):
+        return self.f(*args, **kwargs)
+
+
+class ResolutionTests(SignatureTests):
+    def test_cycle(self):
+        self.assertSigsEqual(specifiers.signature(_cycle_a),
+                             support.s('a, *args, **kwargs'))
+        self.assertSigsEqual(specifiers.signature(_cycle_b),
+                             support.s('a, *args, **kwargs'))
+
+    def test_growing_cycle(self):
+        self.assertSigsEqual(specifiers.signature(_grow_a),
+                             support.s('*args, **kwargs'))
+
+    def test_mutual_methods(self):
+        obj = _Mutual()
+        self.assertSigsEqual(specifiers.signature(obj.f),
+                             support.s('*args, **kwargs'))
+        self.assertSigsEqual(specifiers.signature(obj.g),
+                             support.s('*args, **kwargs'))
+
+    def test_across_forgers(self):
+        resolutions = []
+        @specifiers.forger_function
+        def forger(obj):
+            resolutions.append(_specifiers.Resolution.current())
+            return specifiers.signature(_forger_chain_inner)
+        @forger()
+        def forged(*args, **kwargs):
+            raise NotImplementedError
+        def outer(*args, **kwargs):
+            forged(*args, **kwargs)
+        self.assertSigsEqual(specifiers.signature(outer),
+                             support.s('c, d, e'))
+        self.assertEqual(len(resolutions), 1)
+        resolution = resolutions[0]
+        self.assertIsNotNone(resolution)
+        self.assertIn((id(_forger_chain_end), True, True),
+                      resolution.memo)
+        self.assertIn((id(outer), True, True), resolution.memo)
+
+    def test_diamond(self):
+        with patch.object(_specifiers, '_forged_signature',
+                          wraps=_specifiers._forged_signature) as forged:
+            self.assertSigsEqual(specifiers.signature(_diamond),
+                                 support.s('x, y'))
+        resolved = [call[0][0] for call in forged.call_args_list]
+        self.assertEqual(resolved.count(_diamond_core), 1)
+
+    def test_separate_resolutions(self):
+        with patch.object(_specifiers, '_forged_signature',
+                          wraps=_specifiers._forged_signature) as forged:
+            specifiers.signature(_diamond_left)
+            specifiers.signature(_diamond_right)
+        resolved = [call[0][0] for call in forged.call_args_list]
+        self.assertEqual(resolved.count(_diamond_core), 2)
+        self.assertIsNone(_specifiers.Resolution.current())
+
+
+class BudgetTests(SignatureTests):
+    def _test(self, budget, expected, exhaustions=1):
+        self.assertSigsEqual(
+            specifiers.signature(_diamond, budget=budget),
+            support.s(expected))
+        self.assertEqual(budget.exhaustions, exhaustions)
+
+    def test_unlimited(self):
+        self._test(specifiers.Budget(), 'x, y', 0)
+
+    def test_depth(self):
+        self._test(specifiers.Budget(max_depth=0), '*args, **kwargs')
+
+    def test_functions(self):
+        self._test(specifiers.Budget(max_functions=1), '*args, **kwargs')
+
+    def test_time(self):
+        self._test(specifiers.Budget(max_time=0), '*args, **kwargs')
+
+    def test_reused(self):
+        budget = specifiers.Budget(max_functions=1)
+        specifiers.signature(_diamond, budget=budget)
+        specifiers.signature(_diamond, budget=budget)
+        self.assertEqual(budget.exhaustions, 2)
+
+    def test_across_forgers(self):
+        budget = specifiers.Budget(max_functions=2)
+        self.assertSigsEqual(
+            specifiers.signature(_forger_chain, budget=budget),
+            support.s('a, b, c, *args, **kwargs'))
+        self.assertEqual(budget.exhaustions, 1)
+
+    def test_not_cached(self):
+        specifiers.signature_cache.enable()
+        self.addCleanup(specifiers.signature_cache.disable)
+        specifiers.signature(
+            _diamond, budget=specifiers.Budget(max_functions=1))
+        self.assertSigsEqual(specifiers.signature(_diamond),
+                             support.s('x, y'))
+
+
+class _BytecodeEngine(object):
+    def setUp(self):
+        for patcher in [
+                patch.object(_autoforwards, '_source_call_templates',
+                             return_value=None),
+                patch.object(_autoforwards, '_templates_by_code',
+                             weakref.WeakKeyDictionary()),
+                patch.object(_autoforwards, 'known_failures',
+                             weakref.WeakKeyDictionary()),
+                ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+if _bytecode.get_instructions is not None:
+    class BytecodeTests(SignatureTests):
+        def test_no_source(self):
+            ns = {'_wrapped': _wrapped}
+            exec('def func(a, *args, **kwargs):\n'
+                 '    return _wrapped(a, *args, **kwargs)\n', ns)
+            func = ns['func']
+            self.assertIsNone(_util.get_ast(func))
+            self.assertSigsEqual(specifiers.signature(func),
+                                 support.s('a, y, *, z'))
+
+        def test_prescreen(self):
+            def func(a, *args, **kwargs):
+                return _wrapped(a, args, kwargs)
+            self.assertFalse(_bytecode.may_forward(func.__code__))
+            with patch.object(_util, 'get_ast') as get_ast:
+                self.assertSigsEqual(specifiers.signature(func),
+                                     support.s('a, *args, **kwargs'))
+            self.assertFalse(get_ast.called)
+
+        def test_prescreen_nested(self):
+            def func(*args):
+                def inner(*a):
+                    return _wrapped(*a)
+                return inner(args)
+            def func2(*args):
+                return lambda: _wrapped(*args)
+            def func3(a, b):
+                return _wrapped(*a, **b)
+            self.assertTrue(_bytecode.may_forward(func.__code__))
+            self.assertTrue(_bytecode.may_forward(func2.__code__))
+            self.assertFalse(_bytecode.may_forward(func3.__code__))
+
+    class BytecodeAutoforwardsTests(_BytecodeEngine, AutoforwardsTests):
+        _test = AutoforwardsTests.__dict__['_test']
+
+    class BytecodeUnresolvableAutoforwardsTests(
+            _BytecodeEngine, UnresolvableAutoforwardsTests):
+        _test = UnresolvableAutoforwardsTests.__dict__['_test']
+
+    if sys.version_info >= (3,):
+        class BytecodePy3AutoforwardsTests(
+                _BytecodeEngine, Py3AutoforwardsTests):
+            _test = Py3AutoforwardsTests.__dict__['_test']
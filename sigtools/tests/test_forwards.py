@@ -20,7 +20,8 @@
 # THE SOFTWARE.
 
 
-from sigtools.signatures import forwards
+from sigtools.signatures import (
+    forwards, embed, mask, IncompatibleSignatures)
 from sigtools.support import s
 
 from sigtools.tests.util import Fixtures
@@ -73,3 +74,46 @@ class ForwardsTests(Fixtures):
     par = (
         'a, *, b, y=None, **z', ['ab', 'yz'], 'a, *p, b, **k', 'x, *, y, **z',
         1, '', False, False, True, True, True)
+
+
+class ComposedForwardsTests(Fixtures):
+    def _test(self, outer, inner, num_args=0, named_args=(),
+                    hide_args=False, hide_kwargs=False,
+                    use_varargs=True, use_varkwargs=True):
+        outer_sig = s(outer, name='o')
+        inner_sig = s(inner, name='i')
+        sig = forwards(
+            outer_sig, inner_sig, num_args, *named_args,
+            hide_args=hide_args, hide_kwargs=hide_kwargs,
+            use_varargs=use_varargs, use_varkwargs=use_varkwargs)
+        exp = embed(
+            outer_sig,
+            mask(inner_sig, num_args, *named_args,
+                 hide_args=hide_args, hide_kwargs=hide_kwargs),
+            use_varargs=use_varargs, use_varkwargs=use_varkwargs)
+        self.assertSigsEqual(sig, exp)
+        self.assertEqual(sig.sources, exp.sources)
+
+    pos = 'a, *args, **kwargs', 'b, c, *, d', 1, 'd'
+    kw = 'a, *p, **k', 'b, c, *, d', 0, 'b'
+    hide = 'a, *p, **k', 'b, *args, c, **kwargs', 0, (), True, True
+    stars = 'a, *p, x, **k', 'b, *args, c, **kwargs', 0, (), False, False
+    no_varargs = 'a, *p, **k', 'b, *args', 0, (), False, False, False
+
+    def test_incompatible(self):
+        outer = s('a, *args, **kwargs', name='o')
+        inner = s('a, *, b', name='i')
+        with self.assertRaises(IncompatibleSignatures) as cm:
+            forwards(outer, inner, 0, 'b')
+        self.assertSigsEqual(cm.exception.sig, s('a'))
+        self.assertEqual(cm.exception.others, (outer,))
+
+    def test_partial_error_message(self):
+        outer = s('*args, **kwargs', name='o')
+        inner = s('a, b=2', name='i')
+        with self.assertRaises(ValueError) as cm:
+            forwards(outer, inner, 3, partial=True)
+        self.assertIn('(a=None, b=None)', str(cm.exception))
+        with self.assertRaises(ValueError) as cm:
+            forwards(outer, inner, 0, 'q', partial=True)
+        self.assertIn('(a=None, b=None)', str(cm.exception))
@@ -0,0 +1,94 @@
+import os
+import json
+import shutil
+import tempfile
+
+from mock import patch
+
+from sigtools import specifiers, support, manifest, _persist, _specifiers
+from sigtools.tests import manifestfixt as fixt
+from sigtools.tests.util import EditedModuleTests
+
+
+class ManifestTests(EditedModuleTests):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'signatures.json')
+        self.manifest = _persist.SignatureManifest()
+        patcher = patch.object(
+            _specifiers, 'signature_stores', [self.manifest])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_public_callables(self):
+        self.assertEqual(
+            set(manifest.public_callables(fixt)),
+            set([fixt.inner, fixt.outer,
+                 fixt.AClass.__dict__['__init__'], fixt.AClass.method]))
+
+    def test_module_entries(self):
+        entries = manifest.module_entries(fixt.__name__)
+        self.assertEqual(
+            set(entries), set([
+                _persist.manifest_key(fixt.inner, True),
+                _persist.manifest_key(fixt.outer, True),
+                _persist.manifest_key(fixt.AClass.method, True),
+                _persist.manifest_key(
+                    fixt.AClass.__dict__['__init__'], True),
+                ]))
+
+    def test_parallel(self):
+        self.assertEqual(
+            manifest.generate([fixt.__name__], jobs=1),
+            manifest.generate([fixt.__name__], jobs=2))
+
+    def test_errors(self):
+        entries, errors = manifest.generate(
+            ['sigtools.tests.manifestfixt', 'sigtools.tests.sphinxextfixt'],
+            jobs=1)
+        self.assertEqual(errors, [])
+        self.assertIn(_persist.manifest_key(fixt.outer, True), entries)
+
+    def test_main(self):
+        manifest.main(['-j', '1', '-o', self.path, fixt.__name__])
+        self.manifest.load(self.path)
+        with patch.object(_specifiers, '_forged_signature') as forged:
+            sig = specifiers.signature(fixt.AClass.method)
+        self.assertFalse(forged.called)
+        self.assertSigsEqual(sig, support.s('y, x, a, b=1, *args, **kwargs'))
+        self.assertEqual(sig.sources, specifiers.signature(
+            fixt.AClass.method).sources)
+
+    def test_code_changed(self):
+        manifest.main(['-j', '1', '-o', self.path, fixt.__name__])
+        with open(self.path) as f:
+            data = json.load(f)
+        key = _persist.manifest_key(fixt.outer, True)
+        data['entries'][key.rsplit(':', 1)[0] + ':changed'] = (
+            data['entries'].pop(key))
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        self.manifest.load(self.path)
+        self.assertIsNone(self.manifest.get(fixt.outer, True))
+        self.assertSigsEqual(specifiers.signature(fixt.outer),
+                             support.s('x, a, b=1, *args, **kwargs'))
+
+    def test_module_changed(self):
+        module = self.edit_module(num_args=1, helper='impl_a')
+        manifest.main(['-j', '1', '-o', self.path, module.__name__])
+        module = self.edit_module(num_args=2, helper='impl_b')
+        self.manifest.load(self.path)
+        self.assertIsNone(self.manifest.get(module.outer, True))
+        self.assertIsNone(self.manifest.get(module.rebound, True))
+        self.assertSigsEqual(
+            specifiers.signature(module.outer), support.s('x, c'))
+        self.assertSigsEqual(
+            specifiers.signature(module.rebound), support.s('x, b'))
+
+    def test_unloaded(self):
+        manifest.main(['-j', '1', '-o', self.path, fixt.__name__])
+        self.manifest.load(self.path)
+        self.manifest.unload()
+        self.assertFalse(self.manifest.enabled)
+        self.assertIsNone(self.manifest.get(fixt.outer, True))
@@ -54,6 +54,16 @@ class MaskTests(Fixtures):
 
     eat_into_varargs = '*args', 'a, *args', 2
 
+    pos_then_named = '<b>, c, *, e', '<a>, <b>, c, d, *, e, f', 1, 'df'
+
+    wide = (
+        ', '.join('a{0}'.format(i) for i in range(100, 250)) + ', *, '
+        + ', '.join('k{0}'.format(i) for i in range(50, 100)) + ', '
+        + ', '.join('a{0}'.format(i) for i in range(251, 300)),
+        ', '.join('a{0}'.format(i) for i in range(300)) + ', *, '
+        + ', '.join('k{0}'.format(i) for i in range(100)),
+        100, ['a250'] + ['k{0}'.format(i) for i in range(50)])
+
     name_pok_last = 'a, b', 'a, b, c', 0, 'c'
     name_pok = 'a, *, c', 'a, b, c', 0, 'b'
     name_pok_last_hide_va = 'a, b', 'a, b, c, *args', 0, 'c'
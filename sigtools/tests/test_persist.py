@@ -0,0 +1,292 @@
+import os
+import json
+import shutil
+import tempfile
+
+from mock import patch
+
+from sigtools import specifiers, support, _persist, _specifiers
+from sigtools.tests.util import EditedModuleTests
+
+
+_marker = object()
+
+
+def _inner(a, b=1, c=_marker, *args, **kwargs):
+    raise NotImplementedError
+
+
+def _outer(x, *args, **kwargs):
+    return _inner(*args, **kwargs)
+
+
+def _mutable(x=[], y={}):
+    raise NotImplementedError
+
+
+class PersistTests(EditedModuleTests):
+    def test_round_trip(self):
+        sig = specifiers.signature(_outer)
+        loaded = _persist.load_signature(
+            json.loads(json.dumps(_persist.dump_signature(sig, _outer))))
+        self.assertSigsEqual(loaded, sig)
+        self.assertEqual(loaded.sources, sig.sources)
+        self.assertIs(loaded.parameters['c'].default, _marker)
+
+    def test_mutable_defaults(self):
+        data = json.loads(json.dumps(_persist.dump_signature(
+            specifiers.signature(_mutable), _mutable)))
+        sig = _persist.load_signature(data)
+        self.assertIs(sig.parameters['x'].default, _mutable.__defaults__[0])
+        self.assertIs(sig.parameters['y'].default, _mutable.__defaults__[1])
+
+    def test_code_changed(self):
+        data = _persist.dump_signature(specifiers.signature(_outer), _outer)
+        data['hashes'][_persist.qualified_name(_inner)] = 'changed'
+        with self.assertRaises(_persist.Unserializable):
+            _persist.load_signature(data)
+
+    def test_defaults_changed(self):
+        data = _persist.dump_signature(specifiers.signature(_outer), _outer)
+        defaults = _inner.__defaults__
+        self.addCleanup(setattr, _inner, '__defaults__', defaults)
+        _inner.__defaults__ = (2,) + defaults[1:]
+        with self.assertRaises(_persist.Unserializable):
+            _persist.load_signature(data)
+
+    def test_hash_defaults(self):
+        def func(a, b=1):
+            raise NotImplementedError
+        func.__kwdefaults__ = {'c': 2}
+        digest = _persist.code_hash(func)
+        func.__defaults__ = (2,)
+        self.assertNotEqual(_persist.code_hash(func), digest)
+        func.__defaults__ = (1,)
+        self.assertEqual(_persist.code_hash(func), digest)
+        func.__kwdefaults__ = {'c': 3}
+        self.assertNotEqual(_persist.code_hash(func), digest)
+        func.__kwdefaults__ = {'c': 2}
+        self.assertEqual(_persist.code_hash(func), digest)
+        func.__annotations__ = {'a': 'x'}
+        self.assertNotEqual(_persist.code_hash(func), digest)
+
+    def test_hash_object_default(self):
+        digest = _persist.code_hash(_inner)
+        defaults = _inner.__defaults__
+        self.addCleanup(setattr, _inner, '__defaults__', defaults)
+        _inner.__defaults__ = defaults[:1] + (object(),)
+        self.assertEqual(_persist.code_hash(_inner), digest)
+
+    def test_unresolvable(self):
+        def func(a):
+            raise NotImplementedError
+        with self.assertRaises(_persist.Unserializable):
+            _persist.dump_signature(specifiers.signature(func), func)
+
+    def test_decorator_changed(self):
+        module = self.edit_module(num_args=1)
+        data = _persist.dump_signature(
+            specifiers.signature(module.outer), module.outer)
+        module = self.edit_module(num_args=2)
+        with self.assertRaises(_persist.Unserializable):
+            _persist.load_signature(data)
+
+    def test_global_rebound(self):
+        module = self.edit_module(helper='impl_a')
+        data = _persist.dump_signature(
+            specifiers.signature(module.rebound), module.rebound)
+        module = self.edit_module(helper='impl_b')
+        with self.assertRaises(_persist.Unserializable):
+            _persist.load_signature(data)
+
+    def test_module_unchanged(self):
+        module = self.edit_module()
+        sig = specifiers.signature(module.outer)
+        data = _persist.dump_signature(sig, module.outer)
+        module = self.edit_module()
+        self.assertSigsEqual(_persist.load_signature(data), sig)
+
+    def test_module_hash(self):
+        module = self.edit_module()
+        digest = _persist.module_hash(module.__name__)
+        self.assertIsNotNone(digest)
+        self.assertEqual(_persist.module_hash(module.__name__), digest)
+        self.edit_module(num_args=2)
+        self.assertNotEqual(_persist.module_hash(module.__name__), digest)
+        self.assertIsNone(_persist.module_hash('_sigtools_not_imported'))
+
+
+class PersistentCacheTests(EditedModuleTests):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'signatures.json')
+        self.cache = _persist.PersistentCache()
+        patcher = patch.object(_specifiers, 'signature_stores', [self.cache])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache.enable(self.path)
+        self.addCleanup(self.cache.disable)
+
+    def test_reload(self):
+        sig = specifiers.signature(_outer)
+        self.cache.save()
+        self.cache.enable(self.path)
+        with patch.object(_specifiers, '_forged_signature') as forged:
+            loaded = specifiers.signature(_outer)
+        self.assertFalse(forged.called)
+        self.assertSigsEqual(loaded, sig)
+        self.assertSigsEqual(
+            loaded, support.s('x, a, b=1, c=c, *args, **kwargs',
+                              locals={'c': _marker}))
+
+    def test_args_not_stored(self):
+        specifiers.signature(_outer, args=(1,))
+        self.assertIsNone(self.cache.get(_outer, True))
+        self.assertIsNotNone(self.cache.get(_inner, True))
+
+    def _reload(self, func):
+        specifiers.signature(func)
+        self.cache.save()
+        self.cache.enable(self.path)
+
+    def test_decorator_changed(self):
+        self._reload(self.edit_module(num_args=1).outer)
+        module = self.edit_module(num_args=2)
+        self.assertIsNone(self.cache.get(module.outer, True))
+        self.assertSigsEqual(
+            specifiers.signature(module.outer), support.s('x, c'))
+
+    def test_global_rebound(self):
+        self._reload(self.edit_module(helper='impl_a').rebound)
+        module = self.edit_module(helper='impl_b')
+        self.assertIsNone(self.cache.get(module.rebound, True))
+        self.assertSigsEqual(
+            specifiers.signature(module.rebound), support.s('x, b'))
+
+    def test_disabled(self):
+        self.cache.disable()
+        specifiers.signature(_outer)
+        self.assertEqual(self.cache.entries, {})
+        self.assertFalse(os.path.exists(self.path))
+
+
+class SharedStoreTests(EditedModuleTests):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'signatures.shm')
+        self.store = self._attach()
+        patcher = patch.object(_specifiers, 'signature_stores', [self.store])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _attach(self, size=64 * 1024):
+        store = _persist.SharedSignatureStore()
+        store.attach(self.path, size)
+        self.addCleanup(store.detach)
+        return store
+
+    def test_shared(self):
+        sig = specifiers.signature(_outer)
+        other = self._attach()
+        self.assertEqual(other.index, {})
+        loaded = other.get(_outer, True)
+        self.assertSigsEqual(loaded, sig)
+        self.assertEqual(loaded.sources, sig.sources)
+
+    def test_decorator_changed(self):
+        specifiers.signature(self.edit_module(num_args=1).outer)
+        module = self.edit_module(num_args=2)
+        other = self._attach()
+        self.assertIsNone(other.get(module.outer, True))
+        self.assertSigsEqual(
+            specifiers.signature(module.outer), support.s('x, c'))
+
+    def test_not_a_store(self):
+        with open(self.path, 'r+b') as f:
+            f.write(b'garbage!')
+        with self.assertRaises(ValueError):
+            self._attach()
+
+    def test_full(self):
+        self.store.detach()
+        os.unlink(self.path)
+        store = self._attach(size=64)
+        store.put(_outer, True, specifiers.signature(_outer))
+        self.assertIsNone(store.get(_outer, True))
+
+    def test_forked(self):
+        if not hasattr(os, 'fork'):
+            return
+        pid = os.fork()
+        if not pid: # pragma: no cover
+            try:
+                specifiers.signature(_outer)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertSigsEqual(self.store.get(_outer, True), support.s(
+            'x, a, b=1, c=c, *args, **kwargs', locals={'c': _marker}))
+
+    def _records(self, store):
+        offset = store.header.size
+        end = store.header.unpack_from(store.map, 0)[1]
+        count = 0
+        while offset < end:
+            length, = store.length.unpack_from(store.map, offset)
+            offset += store.length.size
+            key, _, data = store.map[offset:offset + length].partition(b'\0')
+            json.loads(data.decode('utf-8'))
+            offset += length
+            count += 1
+        return count
+
+    def test_forked_writers(self):
+        if not hasattr(os, 'fork'):
+            return
+        self.store.detach()
+        os.unlink(self.path)
+        store = self._attach(size=1024 * 1024)
+        sig = specifiers.signature(_outer)
+        pids = []
+        for i in range(4):
+            pid = os.fork()
+            if not pid: # pragma: no cover
+                try:
+                    for j in range(50):
+                        store.put(_outer, True, sig)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        self.assertEqual(self._records(store), 200)
+
+    def test_corrupt_record(self):
+        sig = specifiers.signature(_outer)
+        # the first record is that of _inner, which is resolved first
+        offset = self.store.header.size + self.store.length.size
+        self.store.map[offset:offset + 2] = b'\xff\xfe'
+        other = self._attach()
+        self.assertSigsEqual(other.get(_outer, True), sig)
+        self.assertIsNone(other.get(_inner, True))
+        inner_sig = specifiers.signature(_inner)
+        self.store.put(_inner, True, inner_sig)
+        self.assertSigsEqual(other.get(_inner, True), inner_sig)
+
+    def test_corrupt_length(self):
+        specifiers.signature(_outer)
+        self.store.length.pack_into(
+            self.store.map, self.store.header.size, 1 << 30)
+        other = self._attach()
+        self.assertIsNone(other.get(_outer, True))
+
+    def test_loaded_once(self):
+        specifiers.signature(_outer)
+        other = self._attach()
+        sig = other.get(_outer, True)
+        with patch.object(_persist, 'load_signature') as load:
+            self.assertIs(other.get(_outer, True), sig)
+        self.assertFalse(load.called)
+
@@ -20,12 +20,23 @@
 # THE SOFTWARE.
 
 
-from functools import partial
+import gc
+import copy
+import pickle
+import weakref
+from functools import partial, wraps
+
+from mock import patch
 
 from sigtools._signatures import (
-    sort_params, apply_params, IncompatibleSignatures, signature)
+    sort_params, apply_params, IncompatibleSignatures, signature,
+    function_signature, FrozenSignature, AlgebraCache, merge, embed, mask,
+    forwards, ParameterLayout, parameter_layout, SortedParameters, _Merger,
+    _merge_all, _sorted, source_tracking, SourceList, Signature,
+    WeakSourceList, WeakDepths, FrozenSources)
+from sigtools import support
 from sigtools.support import s, f
-from sigtools._util import OrderedDict
+from sigtools._util import OrderedDict, funcsigs
 
 from sigtools.tests.util import SignatureTests, Fixtures
 
@@ -71,6 +82,232 @@ class PartialSigTests(Fixtures):
     kw_create = _kw_create(_func1)
 
 
+class FunctionSignatureTests(Fixtures):
+    def _test(self, params, ret=''):
+        try:
+            func = support.make_func(
+                'def func({0}){1}:\n    pass'.format(params, ret),
+                locals={'marker': object()})
+        except SyntaxError:
+            return
+        sig = function_signature(func)
+        self.assertEqual(sig, funcsigs.signature(func))
+        self.assertEqual(sig.sources, signature(func).sources)
+        self.assertEqual(sig.sources['+depths'], {func: 0})
+
+    empty = '',
+    pok = 'a, b',
+    defaults = 'a, b=1, c=marker',
+    varargs = 'a, *args',
+    varkwargs = 'a, **kwargs',
+    locals_ = 'a, *args, **kwargs',
+    kwo = 'a, *, b, c=2',
+    kwo_varargs = 'a, *args, b=1, c, **kwargs',
+    pos = 'a, b=1, /, c=2',
+    annotations = 'a: int, *args: "x", b: marker=1, **kwargs: 3',
+    return_annotation = 'a', ' -> "ret"',
+
+
+class FunctionSignatureFallbackTests(SignatureTests):
+    def test_not_function(self):
+        self.assertIsNone(function_signature(partial(f('a, b'), 1)))
+        self.assertIsNone(function_signature(len))
+
+    def test_wrapped(self):
+        def inner(a, b):
+            raise NotImplementedError
+        @wraps(inner)
+        def outer(*args, **kwargs):
+            raise NotImplementedError
+        outer.__wrapped__ = inner
+        self.assertIsNone(function_signature(outer))
+        self.assertSigsEqual(signature(outer), s('a, b'))
+
+    def test_signature_attribute(self):
+        def func(*args, **kwargs):
+            raise NotImplementedError
+        func.__signature__ = s('a, b')
+        self.assertIsNone(function_signature(func))
+        self.assertSigsEqual(signature(func), s('a, b'))
+
+
+class FrozenSignatureTests(SignatureTests):
+    def test_hashable(self):
+        sig = s('a, b=1, *args, c, **kwargs')
+        frozen = sig.freeze()
+        self.assertIsInstance(frozen, FrozenSignature)
+        self.assertIs(frozen.freeze(), frozen)
+        self.assertEqual(frozen.sources, sig.sources)
+        self.assertEqual({frozen: 1}[sig.freeze()], 1)
+
+    def test_equality(self):
+        func = f('a, b=1, *args, c=2')
+        frozen = signature(func).freeze()
+        self.assertEqual(frozen, signature(func).freeze())
+        self.assertEqual(frozen, signature(func))
+        self.assertEqual(signature(func), frozen)
+        self.assertNotEqual(frozen, s('a, b=1, *args, d=2').freeze())
+        self.assertNotEqual(frozen, s('a, b=2, *args, c=2').freeze())
+        self.assertNotEqual(frozen, s('a, /, b=1, *args, c=2').freeze())
+        self.assertNotEqual(frozen, s('a, b=1, *args, c=2', 'int').freeze())
+
+    def test_equal_defaults(self):
+        one, other = [1], [1]
+        sig = s('a=one', locals={'one': one}).freeze()
+        self.assertEqual(sig, s('a=one', locals={'one': one}).freeze())
+        unfrozen = s('a=other', locals={'other': other})
+        self.assertEqual(sig, unfrozen.freeze())
+        self.assertEqual(hash(sig), hash(unfrozen.freeze()))
+        self.assertEqual(sig, unfrozen)
+        self.assertEqual(sig.thaw(), unfrozen)
+        self.assertNotEqual(sig, s('a=two', locals={'two': [2]}).freeze())
+
+    def test_frozen(self):
+        frozen = s('a').freeze()
+        with self.assertRaises(AttributeError):
+            frozen.sources = {}
+
+    def test_replace(self):
+        sig = s('a, b')
+        frozen = sig.freeze().replace(return_annotation=int)
+        self.assertIsInstance(frozen, FrozenSignature)
+        self.assertIs(frozen.return_annotation, int)
+        self.assertEqual(frozen.sources, sig.sources)
+        self.assertSigsEqual(frozen.thaw(), sig.replace(return_annotation=int))
+
+    def test_sources_frozen(self):
+        sig = s('a, b')
+        frozen = sig.freeze()
+        self.assertIsNot(frozen.sources, sig.sources)
+        with self.assertRaises(TypeError):
+            frozen.sources['a'] = []
+        with self.assertRaises(TypeError):
+            frozen.sources['+depths'].clear()
+        sig.sources['c'] = []
+        self.assertNotIn('c', frozen.sources)
+        thawed = frozen.thaw()
+        thawed.sources['+depths'].clear()
+        self.assertEqual(len(frozen.sources['+depths']), 1)
+        pickled = pickle.loads(pickle.dumps(FrozenSources({'a': [len]})))
+        self.assertEqual(pickled, {'a': [len]})
+        self.assertIs(type(pickled), FrozenSources)
+
+
+    def _copyable(self):
+        sig = s('a, b=1, *args, c=2', 'int')
+        return Signature(
+            sig.parameters.values(), return_annotation=int,
+            sources={'a': [len], 'b': [len], 'c': [abs],
+                     '+depths': {len: 0, abs: 1}}).freeze()
+
+    def _assertCopy(self, copied, frozen):
+        self.assertIs(type(copied), FrozenSignature)
+        self.assertSigsEqual(copied, frozen)
+        self.assertEqual(hash(copied), hash(frozen))
+        self.assertEqual(copied.sources, frozen.sources)
+        self.assertIs(type(copied.sources), FrozenSources)
+        self.assertIs(type(copied.sources['+depths']), FrozenSources)
+
+    def test_copy(self):
+        frozen = self._copyable()
+        self._assertCopy(copy.copy(frozen), frozen)
+        self._assertCopy(copy.deepcopy(frozen), frozen)
+
+    def test_pickle(self):
+        frozen = self._copyable()
+        self._assertCopy(pickle.loads(pickle.dumps(frozen)), frozen)
+
+class AlgebraCacheTests(SignatureTests):
+    def setUp(self):
+        self.cache = AlgebraCache(maxsize=4)
+        patcher = patch('sigtools._signatures.algebra_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _uncached(self, func, *args):
+        self.cache.disable()
+        try:
+            return func(*args)
+        finally:
+            self.cache.enable()
+
+    def _pair(self):
+        outer = f('a, *args, **kwargs')
+        inner = f('b, c, *, d=1')
+        return signature(outer), signature(inner)
+
+    def test_remap_sources(self):
+        outer, inner = self._pair()
+        first = forwards(outer, inner, 1)
+        outer2, inner2 = self._pair()
+        second = forwards(outer2, inner2, 1)
+        self.assertSigsEqual(second, first)
+        self.assertEqual(len(self.cache.entries), 1)
+        expected = self._uncached(forwards, outer2, inner2, 1)
+        self.assertEqual(second.sources, expected.sources)
+        self.assertNotEqual(second.sources, first.sources)
+
+    def test_operations(self):
+        outer, inner = self._pair()
+        for func, args in [
+                (merge, (inner, inner)),
+                (embed, (True, True, outer, inner)),
+                (mask, (inner, 1, False, False, False, False, 'd')),
+                (forwards, (outer, inner, 0, False, False,
+                            True, True, True, 'b'))]:
+            expected = self._uncached(func, *args)
+            self.assertSigsEqual(func(*args), expected)
+            ret = func(*args)
+            self.assertSigsEqual(ret, expected)
+            self.assertEqual(ret.sources, expected.sources)
+
+    def test_shared_callables(self):
+        func = f('a, *args, **kwargs')
+        other = f('a, *args, **kwargs')
+        merge(signature(func), signature(other))
+        sig = merge(signature(func), signature(func))
+        self.assertEqual(sig.sources, {'a': [func, func], 'args': [func, func],
+                                       'kwargs': [func, func],
+                                       '+depths': {func: 0}})
+
+    def test_default_identity(self):
+        one, other = [], []
+        merge(s('a=one', locals={'one': one}))
+        merge(s('a=other', locals={'other': other}))
+        self.assertEqual(len(self.cache.entries), 2)
+
+    def test_frozen(self):
+        outer, inner = self._pair()
+        sig = forwards(outer.freeze(), inner.freeze(), 1)
+        self.assertSigsEqual(sig, s('a, c, *, d=1'))
+        self.assertEqual(
+            sig, forwards(outer.freeze(), inner.freeze(), 1))
+
+    def test_errors_not_cached(self):
+        sig = s('a')
+        with self.assertRaises(ValueError):
+            mask(sig, 2)
+        self.assertEqual(len(self.cache.entries), 0)
+
+    def test_lru(self):
+        sigs = [s('a{0}'.format(i)) for i in range(6)]
+        for sig in sigs:
+            merge(sig)
+        self.assertEqual(len(self.cache.entries), 4)
+        merge(sigs[2])
+        merge(s('b'))
+        self.assertEqual(
+            [key[1][0][0][0] for key in self.cache.entries],
+            ['a4', 'a5', 'a2', 'b'])
+
+    def test_disable(self):
+        merge(s('a'))
+        self.cache.disable()
+        self.assertEqual(len(self.cache.entries), 0)
+        merge(s('a'))
+        self.assertEqual(len(self.cache.entries), 0)
+
+
 class SortParamsTests(SignatureTests):
     def test_empty(self):
         sig = s('')
@@ -112,6 +349,298 @@ class SortParamsTests(SignatureTests):
         self.assertEqual(ret[4], None)
 
 
+class ParameterLayoutTests(Fixtures):
+    def _test(self, sig_str):
+        sig = s(sig_str)
+        layout = parameter_layout(sig)
+        self.assertIs(parameter_layout(sig), layout)
+        posargs, pokargs, varargs, kwoargs, varkwargs = sort_params(sig)
+        self.assertEqual(list(layout.posargs), posargs)
+        self.assertEqual(list(layout.pokargs), pokargs)
+        self.assertEqual(layout.varargs, varargs)
+        self.assertEqual(layout.kwoargs, kwoargs)
+        self.assertEqual(layout.varkwargs, varkwargs)
+        applied = apply_params(
+            sig, posargs, pokargs, varargs, kwoargs, varkwargs, {})
+        applied_layout = parameter_layout(applied)
+        computed = ParameterLayout(layout.params)
+        for attr in ParameterLayout.__slots__[:-1]:
+            self.assertEqual(getattr(applied_layout, attr),
+                             getattr(computed, attr))
+
+    empty = '',
+    pos = 'a, b, /',
+    pok = 'a, b',
+    all_kinds = 'a, /, b, *args, c, d, **kwargs',
+    no_varargs = 'a, /, b, *, c, **kwargs',
+    stars = '*args, **kwargs',
+    kwo = '*, a, b',
+
+
+class SortedCopiesTests(SignatureTests):
+    def test_sort_params_copies(self):
+        sig = s('a, /, b, *, c')
+        posargs, pokargs, _, kwoargs, _, src = sort_params(sig, sources=True)
+        posargs.pop()
+        pokargs.pop()
+        kwoargs.clear()
+        src['a'] = [None]
+        self.assertEqual(sort_params(sig)[:2], ([sig.parameters['a']],
+                                                 [sig.parameters['b']]))
+        self.assertEqual(len(parameter_layout(sig).kwoargs), 1)
+        self.assertEqual(len(sig.sources['a']), 1)
+
+    def test_merge_one(self):
+        sig = s('a')
+        merged = merge(sig)
+        merged.sources['a'] = [None]
+        self.assertEqual(len(sig.sources['a']), 1)
+
+    def test_mask_keeps_input(self):
+        sig = s('a, b, *, c')
+        self.assertSigsEqual(mask(sig, 1, False, False, False, False, 'c'),
+                             s('b'))
+        self.assertEqual(set(sig.sources), set(['a', 'b', 'c', '+depths']))
+        self.assertSigsEqual(sig, s('a, b, *, c'))
+
+    def test_mask_depths(self):
+        sig = s('a, b')
+        masked = mask(sig, 1, False, False, False, False)
+        self.assertIsNot(masked.sources['+depths'], sig.sources['+depths'])
+        masked.sources['+depths'].clear()
+        self.assertEqual(len(sig.sources['+depths']), 1)
+
+
+class SourceListTests(SignatureTests):
+    def test_immutable(self):
+        funcs = signature(f('a')).sources['a']
+        self.assertRaises(TypeError, funcs.append, None)
+        self.assertRaises(TypeError, funcs.extend, [None])
+        self.assertRaises(TypeError, funcs.__setitem__, 0, None)
+        self.assertRaises(TypeError, funcs.__delitem__, 0)
+        with self.assertRaises(TypeError):
+            funcs += [None]
+        self.assertEqual(len(funcs), 1)
+
+    def test_list(self):
+        func = f('a')
+        funcs = SourceList([func])
+        self.assertEqual(funcs, [func])
+        self.assertEqual(funcs + [None], [func, None])
+        self.assertIs(type(copy.copy(funcs)), SourceList)
+        pickled = pickle.loads(pickle.dumps(SourceList([len])))
+        self.assertEqual(pickled, [len])
+        self.assertIs(type(pickled), SourceList)
+
+    def test_shared(self):
+        outer = signature(f('a, *args, **kwargs', name='outer'))
+        inner = signature(f('b, *, c=1', name='inner'))
+        sig = forwards(outer, inner)
+        self.assertIs(sig.sources['a'], outer.sources['a'])
+        self.assertIs(sig.sources['c'], inner.sources['c'])
+        src = sort_params(sig, sources=True)[-1]
+        self.assertIs(src['b'], inner.sources['b'])
+        self.assertIsNot(src, sig.sources)
+        self.assertIsNot(src['+depths'], sig.sources['+depths'])
+
+    def test_plain_lists(self):
+        func = f('a, b')
+        sig = Signature(s('a, b').parameters.values(),
+                        sources={'a': [func], 'b': [func]})
+        merged = merge(sig, sig)
+        self.assertEqual(merged.sources['a'], [func, func])
+        self.assertIs(type(merged.sources['a']), SourceList)
+        self.assertIs(type(sort_params(sig, True)[-1]['a']), SourceList)
+
+
+class _Plugin(object):
+    def method(self, a, *args, **kwargs):
+        raise NotImplementedError
+
+
+class WeakSourcesTests(SignatureTests):
+    def setUp(self):
+        source_tracking.enable(weak=True)
+        self.addCleanup(source_tracking.enable)
+
+    def _merged(self):
+        kept = f('a, *, b=1, **kwargs', name='kept')
+        dropped = f('a, *, c=2, **kwargs', name='dropped')
+        sig = merge(signature(kept), signature(dropped))
+        return kept, weakref.ref(dropped), sig
+
+    def test_sources(self):
+        kept, dropped, sig = self._merged()
+        self.assertIs(type(sig.sources['a']), WeakSourceList)
+        self.assertIs(type(sig.sources['+depths']), WeakDepths)
+        self.assertSourcesEqual(sig.sources, {
+            'kept': 'ab', 'dropped': ['a', 'c', 'kwargs'],
+            '+depths': {'kept': 0, 'dropped': 0}})
+
+    def test_pruned(self):
+        kept, dropped, sig = self._merged()
+        gc.collect()
+        self.assertIsNone(dropped())
+        self.assertEqual(sig.sources['a'], [kept])
+        self.assertEqual(sig.sources['c'], [])
+        self.assertEqual(dict(sig.sources['+depths']), {kept: 0})
+        self.assertEqual(len(sig.sources['+depths']), 1)
+
+    def test_cached(self):
+        outer = f('a, *args, **kwargs', name='outer')
+        inner = f('b, *, c', name='inner')
+        forwards(signature(outer), signature(inner))
+        sig = forwards(signature(outer), signature(inner))
+        self.assertIs(type(sig.sources['c']), WeakSourceList)
+        inner = weakref.ref(inner)
+        gc.collect()
+        self.assertIsNone(inner())
+        self.assertEqual(sig.sources['b'], [])
+        self.assertEqual(sig.sources['a'], [outer])
+
+    def test_bound_method(self):
+        plugin = _Plugin()
+        sig = signature(plugin.method)
+        gc.collect()
+        self.assertEqual(sig.sources['a'], [plugin.method])
+        plugin = weakref.ref(plugin)
+        gc.collect()
+        self.assertIsNone(plugin())
+        self.assertEqual(sig.sources['a'], [])
+
+    def test_not_weakly_referenceable(self):
+        sig = signature(partial(object.__new__, object))
+        gc.collect()
+        self.assertEqual(dict(sig.sources['+depths']), {object.__new__: 1})
+
+    def test_strong_sources_converted(self):
+        func = f('a')
+        sig = signature(func)
+        source_tracking.enable()
+        strong = signature(func)
+        self.assertIs(type(strong.sources['a']), SourceList)
+        source_tracking.enable(weak=True)
+        merged = merge(strong, sig)
+        self.assertIs(type(merged.sources['a']), WeakSourceList)
+        self.assertEqual(merged.sources['a'], [func, func])
+
+    def test_list(self):
+        func = f('a')
+        funcs = WeakSourceList([func, len])
+        self.assertEqual(funcs, [func, len])
+        self.assertNotEqual(funcs, [func])
+        self.assertEqual(funcs[1:], [len])
+        self.assertEqual(funcs + [None], [func, len, None])
+        self.assertEqual(repr(funcs), repr([func, len]))
+        pickled = pickle.loads(pickle.dumps(WeakSourceList([len])))
+        self.assertEqual(pickled, [len])
+
+
+class MergeAllTests(Fixtures):
+    def _pairwise(self, sigs):
+        ret = _sorted(sigs[0])
+        for sig in sigs[1:]:
+            ret = SortedParameters(*_Merger(ret, _sorted(sig)))
+        return apply_params(sigs[0], *ret)
+
+    def _test(self, *sig_strs):
+        funcs = [f(sig_str, name='_' + str(i))
+                 for i, sig_str in enumerate(sig_strs)]
+        sigs = [signature(func) for func in funcs]
+        expected = self._pairwise(sigs)
+        sig = _merge_all(*sigs)
+        self.assertSigsEqual(sig, expected)
+        self.assertEqual(list(sig.parameters), list(expected.parameters))
+        self.assertEqual(sig.sources, expected.sources)
+        self.assertEqual(list(sig.sources['+depths']),
+                         list(expected.sources['+depths']))
+
+    positional = '<a>, b', '<c>, *args', '*args', '<d>, e, *args'
+    unbalanced = 'a, b=1, *args, **kwargs', 'a, **kwargs', 'a, c=2, **k'
+    kwoargs = '*, a, **kwargs', '**kwargs', '*, b, **kwargs', '*, a, **k'
+    stars = '*args, **kwargs', 'a, *args, **kwargs', '*args, b, **kwargs'
+
+    def test_shared_callables(self):
+        inner = f('a, **kwargs', name='inner')
+        outer = f('*args, c=1, **kwargs', name='outer')
+        fwd = forwards(signature(outer), signature(inner))
+        sigs = [fwd, signature(inner), fwd, signature(outer)]
+        sig = _merge_all(*sigs)
+        expected = self._pairwise(sigs)
+        self.assertSigsEqual(sig, expected)
+        self.assertEqual(sig.sources, expected.sources)
+        self.assertEqual(sig.sources['+depths'], {inner: 0, outer: 0})
+
+    def test_many(self):
+        sigs = [s('a, *args, b=1, **kwargs', name='_' + str(i))
+                for i in range(100)]
+        sig = merge(*sigs)
+        self.assertSigsEqual(sig, s('a, *args, b=1, **kwargs'))
+        self.assertEqual(sig.sources, self._pairwise(sigs).sources)
+        self.assertEqual(len(sig.sources['a']), 100)
+
+
+class SourceTrackingTests(SignatureTests):
+    def setUp(self):
+        self.addCleanup(source_tracking.enable)
+
+    def _funcs(self):
+        outer = f('a, *args, **kwargs', name='outer')
+        inner = f('b, c, *, d=1', name='inner')
+        return signature(outer), signature(inner)
+
+    def _test(self, func, *args):
+        tracked = func(*args)
+        untracked = func(*args, sources=False)
+        self.assertSigsEqual(untracked, tracked)
+        self.assertNotEqual(tracked.sources, {})
+        self.assertEqual(untracked.sources, {})
+
+    def test_operations(self):
+        outer, inner = self._funcs()
+        self._test(merge, inner, s('b, c, *, d=1'))
+        self._test(embed, True, True, outer, inner)
+        self._test(mask, inner, 1, False, False, False, False, 'd')
+        self._test(forwards, outer, inner, 1, False, False, True, True,
+                   True, 'd')
+
+    def test_signature(self):
+        func = f('a, b=1')
+        self._test(signature, func)
+        self._test(signature, partial(func, 1))
+        self._test(signature, partial(func, b=2))
+
+    def test_global(self):
+        outer, inner = self._funcs()
+        source_tracking.disable()
+        self.assertEqual(signature(f('a')).sources, {})
+        self.assertEqual(forwards(outer, inner, 1).sources, {})
+        sig = forwards(outer, inner, 1, sources=True)
+        self.assertEqual(sig.sources['c'], inner.sources['c'])
+        source_tracking.enable()
+        self.assertEqual(forwards(outer, inner, 1).sources['c'],
+                         inner.sources['c'])
+
+    def test_scope(self):
+        with source_tracking.scope(False):
+            self.assertFalse(source_tracking.active)
+            with source_tracking.scope(None):
+                self.assertFalse(source_tracking.active)
+            with source_tracking.scope(True):
+                self.assertTrue(source_tracking.active)
+            self.assertFalse(source_tracking.active)
+        self.assertTrue(source_tracking.active)
+
+    def test_cached_separately(self):
+        outer, inner = self._funcs()
+        self.assertEqual(forwards(outer, inner, 1, sources=False).sources, {})
+        self.assertEqual(forwards(outer, inner, 1).sources['c'],
+                         inner.sources['c'])
+
+    def test_unexpected_keyword(self):
+        self.assertRaises(TypeError, merge, s('a'), source=False)
+
+
 def p(sig_str):
     sig = s(sig_str)
     return next(iter(sig.parameters.values()))
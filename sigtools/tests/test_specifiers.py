@@ -22,6 +22,10 @@
 
 
 import sys
+import gc
+import pickle
+import weakref
+import functools
 
 from sigtools import modifiers, specifiers, support, _util, signatures
 from sigtools.tests.util import Fixtures, SignatureTests, tup
@@ -43,6 +47,23 @@ _inst = _cls()
 _im_type = type(_inst.method)
 
 
+class _Picklable(object):
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self, a, *args, **kwargs):
+        _free_func(*args, **kwargs)
+
+
+class _PartialProperty(object):
+    @property
+    def partial(self):
+        return functools.partial(_free_func, 1)
+
+    def __call__(self, *args, **kwargs):
+        return self.partial(*args, **kwargs)
+
+
 class ForwardsTest(Fixtures):
     def _test(self, outer, inner, args, kwargs,
                     expected, expected_get, exp_src, exp_src_get):
@@ -473,3 +494,252 @@ class ForgerFunctionTests(SignatureTests):
             support.s('i, j, *, a'),
             specifiers.signature(func))
         func(1, 2, 3, a=4)
+
+
+class TypeForgerTests(SignatureTests):
+    class Command(object):
+        def __init__(self, params):
+            self.params = params
+        def __call__(self, *args, **kwargs):
+            raise NotImplementedError
+
+    def setUp(self):
+        specifiers.register_signature_forger(
+            self.Command, lambda obj: support.s(obj.params))
+        self.addCleanup(
+            specifiers.register_signature_forger, self.Command, None)
+
+    def test_registered(self):
+        self.assertSigsEqual(specifiers.signature(self.Command('a, b')),
+                             support.s('a, b'))
+
+    def test_subclass(self):
+        class Sub(self.Command):
+            pass
+        self.assertSigsEqual(specifiers.signature(Sub('c')),
+                             support.s('c'))
+
+    def test_instance_forger_first(self):
+        cmd = self.Command('a, b')
+        specifiers.set_signature_forger(cmd, lambda obj: support.s('x'))
+        self.assertSigsEqual(specifiers.signature(cmd), support.s('x'))
+
+    def test_fallback(self):
+        cmd = self.Command('a')
+        specifiers.register_signature_forger(self.Command, lambda obj: None)
+        self.assertSigsEqual(specifiers.signature(cmd),
+                             support.s('*args, **kwargs'))
+
+    def test_unregister(self):
+        cmd = self.Command('a')
+        specifiers.register_signature_forger(self.Command, None)
+        self.assertSigsEqual(specifiers.signature(cmd),
+                             support.s('*args, **kwargs'))
+
+
+class IntrospectableTests(SignatureTests):
+    def test_instance_attribute(self):
+        class Callable(object):
+            def __call__(self, *args, **kwargs):
+                raise NotImplementedError
+        plain, forged = Callable(), Callable()
+        self.assertIs(_util.get_introspectable(plain).__func__,
+                      Callable.__dict__['__call__'])
+        specifiers.set_signature_forger(forged, lambda obj: support.s('a'))
+        self.assertIs(_util.get_introspectable(forged), forged)
+        self.assertSigsEqual(specifiers.signature(plain),
+                             support.s('*args, **kwargs'))
+        self.assertSigsEqual(specifiers.signature(forged), support.s('a'))
+
+    def test_instance_call(self):
+        class Obj(object):
+            pass
+        obj = Obj()
+        self.assertEqual(list(_util.iter_call(obj)), [obj])
+        obj.__call__ = _free_func
+        self.assertEqual(list(_util.iter_call(obj)), [obj, _free_func])
+
+    def test_function_attribute(self):
+        def func(*args, **kwargs):
+            raise NotImplementedError
+        self.assertEqual(list(_util.iter_call(func)), [func])
+        func._sigtools__autoforwards_hint = None
+        self.assertIs(_util.get_introspectable(func.__get__(1)).__func__,
+                      func)
+
+    def test_getattr(self):
+        class Dynamic(object):
+            def __getattr__(self, name):
+                if name == '_sigtools__forger':
+                    return lambda obj: support.s('dynamic')
+                raise AttributeError(name)
+            def __call__(self):
+                raise NotImplementedError
+        obj = Dynamic()
+        self.assertIs(_util.get_introspectable(obj), obj)
+        self.assertSigsEqual(specifiers.signature(obj), support.s('dynamic'))
+
+    def test_class_attribute_added(self):
+        class Callable(object):
+            def __call__(self, a):
+                raise NotImplementedError
+        obj = Callable()
+        self.assertSigsEqual(specifiers.signature(obj), support.s('a'))
+        specifiers.set_signature_forger(
+            Callable, staticmethod(lambda obj: support.s('b')))
+        self.assertSigsEqual(specifiers.signature(obj), support.s('b'))
+
+
+class SignatureCacheTests(SignatureTests):
+    def setUp(self):
+        self.cache = specifiers.signature_cache
+        self.cache.enable()
+        self.addCleanup(self.cache.disable)
+
+    def test_same_result(self):
+        def func(a, *args, **kwargs):
+            _free_func(*args, **kwargs)
+        sig = specifiers.signature(func)
+        self.assertSigsEqual(sig, support.s('a, x, y, z'))
+        self.assertIs(specifiers.signature(func), sig)
+        self.assertIsNot(specifiers.signature(func, auto=False), sig)
+
+    def test_args(self):
+        def func(a, *args, **kwargs):
+            a(*args, **kwargs)
+        def other(x, y):
+            raise NotImplementedError
+        sig = specifiers.signature(func, args=(_free_func,))
+        self.assertSigsEqual(sig, support.s('a, x, y, z'))
+        self.assertIs(specifiers.signature(func, args=(_free_func,)), sig)
+        self.assertSigsEqual(specifiers.signature(func, args=(other,)),
+                             support.s('a, x, y'))
+        self.assertSigsEqual(specifiers.signature(func, kwargs={'a': other}),
+                             support.s('a, x, y'))
+        self.assertSigsEqual(specifiers.signature(func),
+                             support.s('a, *args, **kwargs'))
+        self.assertIs(specifiers.signature(func, args=(_free_func,)), sig)
+
+    def test_args_forwarded(self):
+        def inner(b, *args, **kwargs):
+            b(*args, **kwargs)
+        def func(a, *args, **kwargs):
+            inner(a, *args, **kwargs)
+        def other(x, y):
+            raise NotImplementedError
+        self.assertSigsEqual(specifiers.signature(func, args=(_free_func,)),
+                             support.s('a, x, y, z'))
+        self.assertSigsEqual(specifiers.signature(func, args=(other,)),
+                             support.s('a, x, y'))
+
+    def test_args_unused(self):
+        def func(a, *args, **kwargs):
+            _free_func(*args, **kwargs)
+        sig = specifiers.signature(func, args=(1,))
+        self.assertSigsEqual(sig, support.s('a, x, y, z'))
+        self.assertIs(specifiers.signature(func), sig)
+        self.assertIs(specifiers.signature(func, args=(2, 3), kwargs={'z': 4}),
+                      sig)
+
+    def test_args_variants(self):
+        def func(a, *args, **kwargs):
+            a(*args, **kwargs)
+        for i in range(self.cache.max_variants + 2):
+            specifiers.signature(func, args=(support.f('x' * (i + 1)),))
+        _, sigs = self.cache.entries[id(func)]
+        self.assertEqual(len(sigs[True, True]), self.cache.max_variants)
+
+    def test_invalidate(self):
+        func = support.f('a, b')
+        sig = specifiers.signature(func)
+        self.cache.invalidate(func)
+        self.assertIsNot(specifiers.signature(func), sig)
+        sig = specifiers.signature(func)
+        self.cache.clear()
+        self.assertIsNot(specifiers.signature(func), sig)
+
+    def test_collected(self):
+        func = support.f('a, b')
+        specifiers.signature(func)
+        ref = weakref.ref(func)
+        del func
+        gc.collect()
+        self.assertIs(ref(), None)
+
+    def test_object_untouched(self):
+        obj = _Picklable()
+        attrs = dict(vars(obj))
+        sig = specifiers.signature(obj)
+        self.assertIs(specifiers.signature(obj), sig)
+        self.assertEqual(vars(obj), attrs)
+        self.assertSigsEqual(
+            specifiers.signature(pickle.loads(pickle.dumps(obj))), sig)
+
+    def test_collected_entry(self):
+        func = support.f('a, b')
+        specifiers.signature(func)
+        self.assertIn(id(func), self.cache.entries)
+        key = id(func)
+        del func
+        gc.collect()
+        self.assertNotIn(key, self.cache.entries)
+
+    def test_sources_kept(self):
+        obj = _PartialProperty()
+        self.cache.disable()
+        uncached = specifiers.signature(obj)
+        self.cache.enable()
+        sig = specifiers.signature(obj)
+        gc.collect()
+        self.assertIs(specifiers.signature(obj), sig)
+        self.assertSigsEqual(sig, uncached)
+        self.assertEqual(
+            set(type(func) for func in sig.sources['+depths']),
+            set(type(func) for func in uncached.sources['+depths']))
+        self.assertEqual(sig.sources['y'], uncached.sources['y'])
+        func = support.f('a, *args, **kwargs')
+        sig = specifiers.signature(func)
+        self.assertEqual(sig.sources['+depths'], {func: 0})
+        self.assertEqual(sig.sources['a'], [func])
+
+    def test_no_dict(self):
+        class NoDict(object):
+            __slots__ = ()
+            def __call__(self, a):
+                raise NotImplementedError
+        obj = NoDict()
+        self.assertSigsEqual(specifiers.signature(obj), support.s('a'))
+        self.assertIsNot(specifiers.signature(obj), specifiers.signature(obj))
+
+    def test_copied_dict(self):
+        def func(a, b):
+            raise NotImplementedError
+        specifiers.signature(func)
+        @functools.wraps(func)
+        def wrapper(c):
+            raise NotImplementedError
+        del wrapper.__wrapped__
+        self.assertSigsEqual(specifiers.signature(wrapper), support.s('c'))
+
+    def test_disabled(self):
+        self.cache.disable()
+        func = support.f('a, b')
+        self.assertIsNot(specifiers.signature(func), specifiers.signature(func))
+
+    def test_without_sources(self):
+        def func(a, *args, **kwargs):
+            _free_func(*args, **kwargs)
+        sig = specifiers.signature(func, sources=False)
+        self.assertSigsEqual(sig, support.s('a, x, y, z'))
+        self.assertEqual(sig.sources, {})
+        self.assertIs(specifiers.signature(func, sources=False), sig)
+        tracked = specifiers.signature(func)
+        self.assertEqual(tracked.sources['a'], [func])
+        self.assertIs(specifiers.signature(func), tracked)
+        self.assertIs(specifiers.signature(func, sources=False), sig)
+
+    def test_tracking_disabled(self):
+        func = support.f('a, b')
+        signatures.source_tracking.disable()
+        self.addCleanup(signatures.source_tracking.enable)
+        self.assertIs(specifiers.signature(func), specifiers.signature(func))
@@ -20,8 +20,18 @@
 # THE SOFTWARE.
 
 
+import os
+import sys
+import shutil
+import tempfile
+import importlib
 from collections import defaultdict
 
+try:
+    from importlib import reload
+except ImportError: # pragma: no cover
+    from imp import reload
+
 import unittest2
 from repeated_test import tup, WithTestClass
 
@@ -31,7 +41,7 @@ from sigtools._util import funcsigs
 __all__ = [
     'conv_first_posarg',
     'transform_exp_sources', 'transform_real_sources',
-    'SignatureTests', 'Fixtures', 'tup'
+    'SignatureTests', 'EditedModuleTests', 'Fixtures', 'tup'
     ]
 
 
@@ -124,4 +134,61 @@ class SignatureTests(unittest2.TestCase):
             return_annotation=sig.return_annotation)
 
 
+_edited_source = """
+from sigtools.specifiers import forwards_to_function
+
+
+def inner(a, b, c):
+    raise NotImplementedError
+
+
+def impl_a(a):
+    raise NotImplementedError
+
+
+def impl_b(b):
+    raise NotImplementedError
+
+
+helper = {helper}
+
+
+@forwards_to_function(inner, {num_args})
+def outer(x, *args, **kwargs):
+    return inner(*args, **kwargs)
+
+
+def rebound(x, *args, **kwargs):
+    return helper(*args, **kwargs)
+"""
+
+
+class EditedModuleTests(SignatureTests):
+    edited_name = '_sigtools_edited'
+
+    def edit_module(self, num_args=1, helper='impl_a'):
+        """Writes the source of module `edited_name` and imports it, or
+        reloads it if it was already imported."""
+        if not hasattr(self, 'edited_dir'):
+            self.edited_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, self.edited_dir)
+            sys.path.insert(0, self.edited_dir)
+            self.addCleanup(sys.path.remove, self.edited_dir)
+            self.addCleanup(sys.modules.pop, self.edited_name, None)
+            # a bytecode file written in the same second as the edit would
+            # be used in its place
+            self.addCleanup(
+                setattr, sys, 'dont_write_bytecode', sys.dont_write_bytecode)
+            sys.dont_write_bytecode = True
+        path = os.path.join(self.edited_dir, self.edited_name + '.py')
+        with open(path, 'w') as f:
+            f.write(_edited_source.format(num_args=num_args, helper=helper))
+        try:
+            module = sys.modules[self.edited_name]
+        except KeyError:
+            getattr(importlib, 'invalidate_caches', lambda: None)()
+            return importlib.import_module(self.edited_name)
+        return reload(module)
+
+
 Fixtures = WithTestClass(SignatureTests)